@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    benchmarks/camera.py: Camera setup and reference projection for benchmarks and tests
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+from lib.camera import Camera
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def make_camera(W, H, position = None, direction = None):
+
+    # same lens as render_frames.py
+    camera = Camera()
+    camera.set_focal(50.0)
+    camera.set_factor(30)
+    camera.set_center(W / 2, H / 2)
+    if position is not None:
+        camera.set_position(*position)
+    if direction is not None:
+        camera.set_direction(*direction)
+
+    return camera
+
+def reference_get_points(camera, points_3d):
+
+    # Cramer's rule system, solved in double precision
+    kpos = np.array([camera._KPosX, camera._KPosY, camera._KPosZ], dtype = 'f8')
+    ma = np.zeros((points_3d.shape[1], 3, 3), dtype = 'f8')
+    ma[:, :, 0] = camera._KBXX, camera._KBXY, camera._KBXZ
+    ma[:, :, 1] = camera._KBYX, camera._KBYY, camera._KBYZ
+    ma[:, :, 2] = (kpos[:, None] - points_3d.astype('f8')).T
+    kn = np.array([camera._KNX, camera._KNY, camera._KNZ], dtype = 'f8')
+
+    solution = np.linalg.solve(ma, np.broadcast_to(-kn, (points_3d.shape[1], 3))[:, :, None])[:, :, 0]
+    if camera._flip:
+        solution[:, 1] = -solution[:, 1]
+
+    return solution[:, :2].T * camera._factor + np.array([camera._cx, camera._cy])[:, None]
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    benchmarks/projection.py: Per-frame projection micro-benchmark
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import math
+import time
+
+import numpy as np
+import numba as nb
+
+from lib.camera import Camera
+
+from benchmarks.camera import make_camera, reference_get_points
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _legacy_compiled_get_points(camera): # closure-based kernel, re-compiled on every frame
+
+    def get_points(points_3d, points_2d):
+
+        factor = np.float32(camera._factor)
+        flip = camera._flip
+
+        @nb.jit((
+            nb.float32[:, :], nb.float32[:, :],
+            nb.float32[:, :], nb.float32[:], nb.float32[:], nb.float32[:],
+            ), nopython = True)
+        def get_points_jit(
+            points_3d, points_2d,
+            ma, kpos, empty, offset,
+            ):
+
+            for index in range(0, points_3d.shape[1]):
+
+                ma[:, 2] = kpos - points_3d[:, index]
+
+                determ = (
+                      ma[0][0] * ma[1][1] * ma[2][2]
+                    + ma[0][1] * ma[1][2] * ma[2][0]
+                    + ma[0][2] * ma[1][0] * ma[2][1]
+                    - ma[0][2] * ma[1][1] * ma[2][0]
+                    - ma[0][0] * ma[1][2] * ma[2][1]
+                    - ma[0][1] * ma[1][0] * ma[2][2]
+                    )
+
+                if determ == 0:
+                    points_2d[:, index] = empty
+                    continue
+
+                points_2d[0, index] = (
+                      ma[0][3] * ma[1][1] * ma[2][2]
+                    + ma[0][1] * ma[1][2] * ma[2][3]
+                    + ma[0][2] * ma[1][3] * ma[2][1]
+                    - ma[0][2] * ma[1][1] * ma[2][3]
+                    - ma[0][3] * ma[1][2] * ma[2][1]
+                    - ma[0][1] * ma[1][3] * ma[2][2]
+                    )
+                points_2d[1, index] = (
+                      ma[0][0] * ma[1][3] * ma[2][2]
+                    + ma[0][3] * ma[1][2] * ma[2][0]
+                    + ma[0][2] * ma[1][0] * ma[2][3]
+                    - ma[0][2] * ma[1][3] * ma[2][0]
+                    - ma[0][0] * ma[1][2] * ma[2][3]
+                    - ma[0][3] * ma[1][0] * ma[2][2]
+                    )
+
+                points_2d[:, index] *= factor / determ
+
+                if flip:
+                    points_2d[1, index] = -points_2d[1, index]
+
+                points_2d[:, index] += offset
+
+        ma = np.array([
+            [camera._KBXX, camera._KBYX, 0.0, -camera._KNX],
+            [camera._KBXY, camera._KBYY, 0.0, -camera._KNY],
+            [camera._KBXZ, camera._KBYZ, 0.0, -camera._KNZ],
+            ], dtype = 'f4')
+        kpos = np.array([camera._KPosX, camera._KPosY, camera._KPosZ], dtype = 'f4')
+        empty = np.array([np.nan, np.nan], dtype = 'f4')
+        offset = np.array([camera._cx, camera._cy], dtype = 'f4')
+
+        get_points_jit(
+            points_3d, points_2d,
+            ma, kpos, empty, offset,
+            )
+
+    return get_points
+
+def _random_points(n, r, seed = 0):
+
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size = (3, n))
+    points *= r / np.linalg.norm(points, axis = 0)
+
+    return points.astype('f4')
+
+def _time_frames(camera, compiled_get_points, points_3d, frames, dist):
+
+    points_2d = np.zeros((2, points_3d.shape[1]), dtype = 'f4')
+    durations = []
+
+    for frame_index in range(frames):
+        angle = 2 * math.pi * frame_index / frames
+        t0 = time.perf_counter()
+        camera.set_position(dist * math.cos(angle), dist * math.sin(angle), 0.0)
+        camera.set_direction(math.pi + angle, 0.0)
+        compiled_get_points(camera)(points_3d, points_2d)
+        durations.append(time.perf_counter() - t0)
+
+    return np.array(durations), points_2d
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MAIN ROUTINE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def run(n = 100000, frames = 10):
+
+    W, H = 1920, 1080
+    R = 6371000.0
+
+    points_3d = _random_points(n, R)
+    camera = make_camera(W, H)
+
+    t0 = time.perf_counter()
+    Camera.compiled_get_points(camera)(points_3d[:, :1], np.zeros((2, 1), dtype = 'f4'))
+    print(f'first call (compile or cache load): {(time.perf_counter() - t0) * 1e3:.1f} ms')
+
+    before, points_2d_before = _time_frames(camera, _legacy_compiled_get_points, points_3d, frames, 3.0 * R)
+    after, points_2d_after = _time_frames(camera, Camera.compiled_get_points, points_3d, frames, 3.0 * R)
+
+    assert np.allclose(points_2d_before, points_2d_after, rtol = 1e-5, atol = 1e-2, equal_nan = True)
+
+    # camera is left at the last frame's position, see tests/test_camera.py for precision checks
+    reference = reference_get_points(camera, points_3d)
+    scale = np.maximum(np.abs(reference), 1.0) # scale-free error, projections far off-screen are large numbers
+    error_before = np.max(np.abs(points_2d_before - reference) / scale)
+    error_after = np.max(np.abs(points_2d_after - reference) / scale)
+
+    print(f'{n:d} points, {frames:d} frames')
+    print(f'before: {np.median(before) * 1e3:10.3f} ms/frame (median)')
+    print(f'after:  {np.median(after) * 1e3:10.3f} ms/frame (median)')
+    print(f'max. relative error vs. double precision: before {error_before:.2e}, after {error_after:.2e}')
+
+if __name__ == '__main__':
+    run()
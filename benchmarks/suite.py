@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    benchmarks/suite.py: Benchmarks on synthetic data, machine-readable results
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import numba as nb
+import zarr
+
+from lib.camera import split_lines
+from lib.geometry import polar_to_cart
+from lib.image import Image
+from lib.osm import load_osm
+from lib.usgs import UsgsIndex, load_usgs_cart, reencode_usgs
+
+from benchmarks.camera import make_camera
+from benchmarks.synthetic import TIME_START, TIME_END, make_quakes, write_coastlines, write_quakes_csvs
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+W, H = 1920, 1080
+R = 6371000.0
+DEPTH_FACTOR = 6.0
+
+_GET_POINT_MAX = 10000 # pure Python projection is only timed on this many points
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _measure(func, repeat):
+
+    # first call compiles or loads kernels from cache and is not timed
+    func()
+
+    durations = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - t0)
+    durations = np.array(durations)
+
+    return dict(
+        repeat = repeat,
+        min = float(durations.min()),
+        median = float(np.median(durations)),
+        max = float(durations.max()),
+    )
+
+def _quiet(func):
+
+    # reencode_usgs reports progress on stdout / stderr
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            func()
+
+    return wrapper
+
+def _get_commit():
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output = True, check = True, text = True,
+            cwd = os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _bench_reencode(fld, events, repeat, seed):
+
+    usgs_time, usgs_data = make_quakes(events, seed = seed)
+    write_quakes_csvs(os.path.join(fld, 'csv'), usgs_time, usgs_data)
+
+    return dict(reencode_usgs = dict(n = events, **_measure(_quiet(lambda: reencode_usgs(
+        os.path.join(fld, 'csv'), os.path.join(fld, 'data_usgs.zarr'),
+    )), repeat)))
+
+def _bench_projection(usgs_polar, repeat):
+
+    usgs_cart = polar_to_cart(usgs_polar, R, DEPTH_FACTOR)
+    camera = make_camera(W, H, position = (-3.0 * R, 0.0, 0.0), direction = (0.0, 0.0))
+    points_2d = np.zeros((2, usgs_cart.shape[1]), dtype = 'f4')
+    get_point_cart = usgs_cart[:, :_GET_POINT_MAX].astype('f8').T.tolist()
+
+    def get_point():
+        for x, y, z in get_point_cart:
+            camera.get_point(x, y, z)
+
+    return dict(
+        polar_to_cart = dict(n = usgs_polar.shape[1], **_measure(
+            lambda: polar_to_cart(usgs_polar, R, DEPTH_FACTOR), repeat,
+        )),
+        camera_get_point = dict(n = len(get_point_cart), **_measure(get_point, repeat)),
+        camera_compiled_get_points = dict(n = usgs_cart.shape[1], **_measure(
+            lambda: camera.compiled_get_points()(usgs_cart, points_2d), repeat,
+        )),
+    )
+
+def _bench_image(usgs_cart, osm_vertices, osm_offsets, repeat):
+
+    camera = make_camera(W, H, position = (-3.0 * R, 0.0, 0.0), direction = (0.0, 0.0))
+    get_points = camera.compiled_get_points()
+    get_visible = camera.compiled_get_visible(R, W, H)
+
+    usgs_cart_2d = np.zeros((2, usgs_cart.shape[1]), dtype = 'f4')
+    usgs_visible = np.zeros((usgs_cart.shape[1],), dtype = 'bool')
+    get_points(usgs_cart, usgs_cart_2d)
+    get_visible(usgs_cart, usgs_cart_2d, usgs_visible)
+    usgs_cart_2d = usgs_cart_2d[:, usgs_visible]
+
+    osm_vertices_2d = np.zeros((2, osm_vertices.shape[1]), dtype = 'f4')
+    osm_visible = np.zeros((osm_vertices.shape[1],), dtype = 'bool')
+    get_points(osm_vertices, osm_vertices_2d)
+    get_visible(osm_vertices, osm_vertices_2d, osm_visible)
+    osm_index, osm_offsets = split_lines(osm_visible, osm_offsets)
+    osm_vertices_2d = osm_vertices_2d[:, osm_index]
+
+    n = usgs_cart_2d.shape[1]
+    bins = np.arange(n, dtype = 'i8') % 16
+    palette = np.linspace(0.1, 1.0, 16 * 3, dtype = 'f4').reshape(16, 3)
+    weights = np.ones((n,), dtype = 'f4')
+    lut = np.linspace(0.0, 1.0, 256 * 3, dtype = 'f4').reshape(256, 3)
+
+    return dict(
+        image_draw_points = dict(n = n, **_measure(
+            lambda: Image(W, H).draw_points(usgs_cart_2d, color = palette[bins, :].T), repeat,
+        )),
+        image_draw_filledcircles_binned = dict(n = n, **_measure(
+            lambda: Image(W, H).draw_filledcircles_binned(usgs_cart_2d, bins, palette), repeat,
+        )),
+        image_draw_density = dict(n = n, **_measure(
+            lambda: Image(W, H).draw_density(usgs_cart_2d, weights, lut), repeat,
+        )),
+        image_draw_polylines = dict(n = osm_vertices_2d.shape[1], **_measure(
+            lambda: Image(W, H).draw_polylines(osm_vertices_2d, osm_offsets), repeat,
+        )),
+    )
+
+def _bench_index(fld, repeat):
+
+    # candidate ranges for a frame with a 30 day tail, camera as in _bench_projection
+    index = UsgsIndex(os.path.join(fld, 'data_usgs.zarr'))
+    time_end = (TIME_START + TIME_END) // 2
+    time_start = time_end - 30 * 24 * 60 * 60 * 1000
+    position = (-3.0 * R, 0.0, 0.0)
+    starts, stops = index.query(time_start, time_end, position, R)
+
+    return dict(usgs_index_query = dict(n = int(np.sum(stops - starts)), **_measure(
+        lambda: index.query(time_start, time_end, position, R), repeat,
+    )))
+
+def _bench_render_frame(fld, repeat):
+
+    import render_frames # script in repository root
+
+    usgs = zarr.open(os.path.join(fld, 'data_usgs.zarr'), 'r')
+    usgs_cart = load_usgs_cart(os.path.join(fld, 'data_usgs.zarr'), R, DEPTH_FACTOR)
+    osm_levels = load_osm(os.path.join(fld, 'coast'), R)
+    fps, duration = 60, 120
+
+    results = {}
+    for quakes in ('splat', 'cairo', 'heatmap'):
+        context = render_frames._worker_context(
+            fps = fps, duration = duration, W = W, H = H, R = R,
+            output = 'png', quakes = quakes, colors = 'plain',
+            colormap = 'fire', density_scale = 100.0,
+            time_start = TIME_START, time_end = TIME_END,
+            time_tail = 30 * 24 * 60 * 60 * 1000, timing = False,
+            osm_levels = osm_levels, usgs_cart = usgs_cart, usgs_time = usgs['time'][:],
+        )
+        results[f'render_frame_{quakes:s}'] = dict(n = 1, **_measure(
+            lambda: context.render_frame(fps * duration // 2), repeat,
+        ))
+
+    return results
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MAIN ROUTINE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def benchmark(events = 100000, lines = 2000, vertices = 500, repeat = 5, seed = 0, fld = None):
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        fld = tmp if fld is None else fld
+        os.makedirs(fld, exist_ok = True)
+
+        results = {}
+        results.update(_bench_reencode(fld, events, repeat, seed))
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_coastlines(os.path.join(fld, 'coast'), lines, vertices, R, seed = seed)
+
+        usgs_polar = zarr.open(os.path.join(fld, 'data_usgs.zarr'), 'r')['data'][:3, :]
+        osm_vertices, osm_offsets = load_osm(os.path.join(fld, 'coast'), R)[0][1:]
+        results.update(_bench_projection(usgs_polar, repeat))
+        results.update(_bench_image(polar_to_cart(usgs_polar, R, DEPTH_FACTOR), osm_vertices, osm_offsets, repeat))
+        results.update(_bench_index(fld, repeat))
+        results.update(_bench_render_frame(fld, repeat))
+
+    return dict(
+        commit = _get_commit(),
+        python = platform.python_version(),
+        numpy = np.__version__,
+        numba = nb.__version__,
+        machine = platform.machine(),
+        parameters = dict(events = events, lines = lines, vertices = vertices, repeat = repeat, seed = seed),
+        results = results,
+    )
+
+def _parse_args():
+
+    parser = argparse.ArgumentParser(description = 'Run benchmarks on synthetic data')
+    parser.add_argument('--events', type = int, default = 100000, help = 'number of quakes, e.g. 10000 to 10000000')
+    parser.add_argument('--lines', type = int, default = 2000, help = 'number of coastlines')
+    parser.add_argument('--vertices', type = int, default = 500, help = 'vertices per coastline')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'timed runs per benchmark')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--data', default = None, help = 'keep synthetic data in this folder')
+    parser.add_argument('--output', default = None, help = 'write results as JSON into this file')
+
+    return parser.parse_args()
+
+def run():
+
+    args = _parse_args()
+
+    report = benchmark(
+        events = args.events, lines = args.lines, vertices = args.vertices,
+        repeat = args.repeat, seed = args.seed, fld = args.data,
+    )
+
+    for name, result in report['results'].items():
+        print(f'{name:<36s}{result["n"]:>10d}{result["median"] * 1e3:12.3f} ms (median)')
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding = 'utf-8') as f:
+            json.dump(report, f, indent = 2)
+
+if __name__ == '__main__':
+    run()
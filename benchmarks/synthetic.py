@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    benchmarks/synthetic.py: Seeded synthetic quake catalogs and coastlines
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import argparse
+import csv
+import datetime
+import json
+import os
+
+import numpy as np
+
+from lib.osm import reencode_osm
+from lib.usgs import FIELDS, write_usgs_zarr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+TIME_START = int(datetime.datetime(2010, 1, 1, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+TIME_END = int(datetime.datetime(2020, 1, 1, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+
+_CLUSTERS = 64 # seismically active regions
+_CLUSTER_SHARE = 0.8 # share of quakes within clusters, remainder is uniform on sphere
+
+_CSV_HEADER = [
+    'time', 'latitude', 'longitude', 'depth', 'mag', 'magType',
+    'horizontalError', 'depthError', 'magError',
+]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def make_quakes(n, seed = 0, time_start = TIME_START, time_end = TIME_END):
+
+    rng = np.random.default_rng(seed)
+
+    # clustered epicenters, plus a uniform background
+    clustered = rng.random(n) < _CLUSTER_SHARE
+    centers_lon, centers_lat = _uniform_lonlat(rng, _CLUSTERS)
+    cluster = rng.integers(0, _CLUSTERS, n)
+    background_lon, background_lat = _uniform_lonlat(rng, n)
+    lon = np.where(clustered, centers_lon[cluster] + rng.normal(0.0, 3.0, n), background_lon)
+    lat = np.where(clustered, centers_lat[cluster] + rng.normal(0.0, 2.0, n), background_lat)
+    lon = (lon + 180.0) % 360.0 - 180.0
+    lat = np.clip(lat, -90.0, 90.0)
+
+    data = np.zeros((len(FIELDS), n), dtype = 'f4')
+    data[FIELDS.index('lon'), :] = lon
+    data[FIELDS.index('lat'), :] = lat
+    data[FIELDS.index('depth'), :] = np.clip(rng.exponential(30.0, n), 0.0, 700.0) # km
+    data[FIELDS.index('mag'), :] = 1.0 + rng.exponential(1.0 / np.log(10.0), n) # Gutenberg-Richter, b = 1
+    data[FIELDS.index('horizontalError'), :] = rng.exponential(5.0, n)
+    data[FIELDS.index('depthError'), :] = rng.exponential(3.0, n)
+    data[FIELDS.index('magError'), :] = rng.exponential(0.1, n)
+
+    time = np.sort(rng.integers(time_start, time_end, n)).astype('u8')
+
+    return time, data
+
+def write_quakes_csvs(fld, usgs_time, usgs_data, files = 16):
+
+    # CSV files as fetched from USGS, files are named such that sorting by name sorts by time
+    os.makedirs(fld, exist_ok = True)
+
+    for index, part in enumerate(np.array_split(np.arange(usgs_time.shape[0]), files)):
+        time = np.datetime_as_string(usgs_time[part].astype('datetime64[ms]'), unit = 'ms')
+        with open(os.path.join(fld, f'{index:05d}.csv'), 'w', encoding = 'utf-8', newline = '') as f:
+            writer = csv.writer(f)
+            writer.writerow(_CSV_HEADER)
+            writer.writerows(zip(
+                (f'{item:s}Z' for item in time),
+                *(usgs_data[FIELDS.index(field), part].tolist() for field in ('lat', 'lon', 'depth', 'mag')),
+                ('ml' for _ in range(part.shape[0])),
+                *(usgs_data[FIELDS.index(field), part].tolist() for field in ('horizontalError', 'depthError', 'magError')),
+            ))
+
+def write_quakes_zarr(target, n, seed = 0):
+
+    usgs_time, usgs_data = make_quakes(n, seed = seed)
+    write_usgs_zarr(target, usgs_time, usgs_data)
+
+def make_coastlines(lines, vertices, seed = 0):
+
+    # random walks with persistent heading, about 10 km per step
+    rng = np.random.default_rng(seed)
+
+    start_lon, start_lat = _uniform_lonlat(rng, lines)
+    heading = rng.uniform(0.0, 2 * np.pi, lines)[:, None] + np.cumsum(rng.normal(0.0, 0.3, (lines, vertices)), axis = 1)
+    step = 0.09 # deg
+    lat = np.clip(start_lat[:, None] + np.cumsum(step * np.sin(heading), axis = 1), -89.0, 89.0)
+    lon = start_lon[:, None] + np.cumsum(step * np.cos(heading) / np.cos(np.radians(lat)), axis = 1)
+    lon = (lon + 180.0) % 360.0 - 180.0
+
+    return [np.stack([lon[line], lat[line]], axis = 1).tolist() for line in range(lines)]
+
+def write_coastlines(target, lines, vertices, r, seed = 0, max_distance = 700000, tolerances = (1000., 2000., 4000., 8000., 16000.)):
+
+    # GeoJSON as fetched from OSM, one ring per polygon, re-encoded like prepare_osm.py does
+    src = target + '.json'
+    with open(src, 'w', encoding = 'utf-8') as f:
+        json.dump(dict(
+            type = 'GeometryCollection',
+            geometries = [
+                dict(type = 'MultiPolygon', coordinates = [[line]])
+                for line in make_coastlines(lines, vertices, seed = seed)
+            ],
+        ), f)
+
+    reencode_osm(src, target, r, max_distance = max_distance, tolerances = tolerances)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _uniform_lonlat(rng, n):
+
+    return rng.uniform(-180.0, 180.0, n), np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MAIN ROUTINE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _parse_args():
+
+    parser = argparse.ArgumentParser(description = 'Write synthetic data in place of USGS and OSM data')
+    parser.add_argument('--events', type = int, default = 100000, help = 'number of quakes')
+    parser.add_argument('--lines', type = int, default = 2000, help = 'number of coastlines')
+    parser.add_argument('--vertices', type = int, default = 500, help = 'vertices per coastline')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--target', default = '.', help = 'folder receiving data_usgs.zarr and data_osm/')
+
+    return parser.parse_args()
+
+def run():
+
+    args = _parse_args()
+
+    write_quakes_zarr(os.path.join(args.target, 'data_usgs.zarr'), args.events, seed = args.seed)
+    os.makedirs(os.path.join(args.target, 'data_osm'), exist_ok = True)
+    write_coastlines(
+        os.path.join(args.target, 'data_osm', 'earth-seas-10km.coast'),
+        args.lines, args.vertices, 6371000.0, seed = args.seed,
+    )
+
+if __name__ == '__main__':
+    run()
@@ -89,6 +89,14 @@ class Camera:
         self._KBYY = self._KNY * SinB * tmp
         self._KBYZ = -kn_xy_abs * tmp
 
+        # inverse of plane basis with columns BX, BY and N: q = M^-1 (P - KPos) projects
+        # P onto (q0 / q2, q1 / q2), q2 == 0 within the camera's own plane
+        self._KM = tuple(tuple(row) for row in np.linalg.inv(np.array([
+            [self._KBXX, self._KBYX, self._KNX],
+            [self._KBXY, self._KBYY, self._KNY],
+            [self._KBXZ, self._KBYZ, self._KNZ],
+            ], dtype = 'f8')).tolist())
+
     def set_center(self, x, y):
 
         self._cx = x
@@ -119,41 +127,22 @@ class Camera:
         self._KPosY = y
         self._KPosZ = z
 
+    def get_pixel_size(self, distance):
+
+        # size of one pixel in world units at given distance from camera
+        return distance / (self._KD * self._factor)
+
     def get_point(self, x, y, z):
 
-        ma = [
-            [self._KBXX, self._KBYX, -(x - self._KPosX), -self._KNX],
-            [self._KBXY, self._KBYY, -(y - self._KPosY), -self._KNY],
-            [self._KBXZ, self._KBYZ, -(z - self._KPosZ), -self._KNZ],
-            ]
-
-        determ = (
-              ma[0][0] * ma[1][1] * ma[2][2]
-            + ma[0][1] * ma[1][2] * ma[2][0]
-            + ma[0][2] * ma[1][0] * ma[2][1]
-            - ma[0][2] * ma[1][1] * ma[2][0]
-            - ma[0][0] * ma[1][2] * ma[2][1]
-            - ma[0][1] * ma[1][0] * ma[2][2]
-            )
-        xx = (
-              ma[0][3] * ma[1][1] * ma[2][2]
-            + ma[0][1] * ma[1][2] * ma[2][3]
-            + ma[0][2] * ma[1][3] * ma[2][1]
-            - ma[0][2] * ma[1][1] * ma[2][3]
-            - ma[0][3] * ma[1][2] * ma[2][1]
-            - ma[0][1] * ma[1][3] * ma[2][2]
-            )
-        yy = (
-              ma[0][0] * ma[1][3] * ma[2][2]
-            + ma[0][3] * ma[1][2] * ma[2][0]
-            + ma[0][2] * ma[1][0] * ma[2][3]
-            - ma[0][2] * ma[1][3] * ma[2][0]
-            - ma[0][0] * ma[1][2] * ma[2][3]
-            - ma[0][3] * ma[1][0] * ma[2][2]
-            )
+        dx, dy, dz = x - self._KPosX, y - self._KPosY, z - self._KPosZ
+        (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = self._KM
 
-        xx = xx / determ # TODO catch zero
-        yy = yy / determ # TODO catch zero
+        q2 = m20 * dx + m21 * dy + m22 * dz
+        if q2 == 0.0: # parallel to image plane, no projection
+            return math.nan, math.nan
+
+        xx = (m00 * dx + m01 * dy + m02 * dz) / q2
+        yy = (m10 * dx + m11 * dy + m12 * dz) / q2
 
         if self._flip:
             yy = -yy
@@ -162,88 +151,158 @@ class Camera:
 
     def compiled_get_points(self):
 
-        def get_points(points_3d, points_2d):
+        km = np.array(self._KM, dtype = 'f8')
+        kpos = np.array([
+            self._KPosX,
+            self._KPosY,
+            self._KPosZ,
+            ], dtype = 'f8')
+        offset = np.array([
+            self._cx,
+            self._cy,
+            ], dtype = 'f8')
+        factor = float(self._factor)
+        flip = self._flip
 
-            factor = np.float32(self._factor)
-            flip = self._flip
+        def get_points(points_3d, points_2d):
 
-            @nb.jit((
-                nb.float32[:, :], nb.float32[:, :],
-                nb.float32[:, :], nb.float32[:], nb.float32[:], nb.float32[:],
-                ), nopython = True)
-            def get_points_jit(
+            _get_points_jit(
                 points_3d, points_2d,
-                ma, kpos, empty, offset,
-                ):
-
-                for index in range(0, points_3d.shape[1]):
-
-                    ma[:, 2] = kpos - points_3d[:, index]
-
-                    determ = (
-                          ma[0][0] * ma[1][1] * ma[2][2]
-                        + ma[0][1] * ma[1][2] * ma[2][0]
-                        + ma[0][2] * ma[1][0] * ma[2][1]
-                        - ma[0][2] * ma[1][1] * ma[2][0]
-                        - ma[0][0] * ma[1][2] * ma[2][1]
-                        - ma[0][1] * ma[1][0] * ma[2][2]
-                        )
-
-                    if determ == 0:
-                        points_2d[:, index] = empty
-                        continue
-
-                    points_2d[0, index] = (
-                          ma[0][3] * ma[1][1] * ma[2][2]
-                        + ma[0][1] * ma[1][2] * ma[2][3]
-                        + ma[0][2] * ma[1][3] * ma[2][1]
-                        - ma[0][2] * ma[1][1] * ma[2][3]
-                        - ma[0][3] * ma[1][2] * ma[2][1]
-                        - ma[0][1] * ma[1][3] * ma[2][2]
-                        )
-                    points_2d[1, index] = (
-                          ma[0][0] * ma[1][3] * ma[2][2]
-                        + ma[0][3] * ma[1][2] * ma[2][0]
-                        + ma[0][2] * ma[1][0] * ma[2][3]
-                        - ma[0][2] * ma[1][3] * ma[2][0]
-                        - ma[0][0] * ma[1][2] * ma[2][3]
-                        - ma[0][3] * ma[1][0] * ma[2][2]
-                        )
-
-                    points_2d[:, index] *= factor / determ
-
-                    if flip:
-                        points_2d[1, index] = -points_2d[1, index]
-
-                    points_2d[:, index] += offset
-
-            ma = np.array([
-                [self._KBXX, self._KBYX, 0.0, -self._KNX],
-                [self._KBXY, self._KBYY, 0.0, -self._KNY],
-                [self._KBXZ, self._KBYZ, 0.0, -self._KNZ],
-                ], dtype = 'f4')
-            kpos = np.array([
-                self._KPosX,
-                self._KPosY,
-                self._KPosZ,
-                ], dtype = 'f4')
-            empty = np.array([
-                np.nan,
-                np.nan,
-                ], dtype = 'f4')
-            offset = np.array([
-                self._cx,
-                self._cy,
-                ], dtype = 'f4')
-
-            get_points_jit(
-                points_3d, points_2d,
-                ma, kpos, empty, offset,
+                km, kpos, offset,
+                factor, flip,
                 )
 
         return get_points
 
+    def compiled_get_visible(self, r, width, height, margin = 0.0):
+
+        kpos = np.array([
+            self._KPosX,
+            self._KPosY,
+            self._KPosZ,
+            ], dtype = 'f8')
+        kn = np.array([
+            self._KNX,
+            self._KNY,
+            self._KNZ,
+            ], dtype = 'f8')
+        bounds = np.array([
+            -margin, -margin,
+            width + margin, height + margin,
+            ], dtype = 'f4')
+
+        def get_visible(points_3d, points_2d, visible):
+
+            _get_visible_jit(
+                points_3d, points_2d, visible,
+                kpos, kn, r ** 2, bounds,
+                )
+
+        return get_visible
+
     @staticmethod
     def _abs(x, y, z):
 
         return math.sqrt(x ** 2 + y ** 2 + z ** 2)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def split_lines(visible, offsets):
+
+    index = np.zeros((offsets[-1],), dtype = 'i8')
+    # a run takes at least two vertices plus one hidden vertex before the next run of the same line
+    lines = np.zeros((offsets[-1] // 3 + offsets.shape[0],), dtype = 'i8')
+
+    index_len, lines_len = _split_lines_jit(visible, offsets, index, lines)
+
+    return index[:index_len], lines[:lines_len + 1]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@nb.jit(nopython = True, cache = True)
+def _get_points_jit(
+    points_3d, points_2d,
+    km, kpos, offset,
+    factor, flip,
+    ):
+
+    for index in range(0, points_3d.shape[1]):
+
+        dx = points_3d[0, index] - kpos[0]
+        dy = points_3d[1, index] - kpos[1]
+        dz = points_3d[2, index] - kpos[2]
+
+        q2 = km[2, 0] * dx + km[2, 1] * dy + km[2, 2] * dz
+
+        if q2 == 0.0: # parallel to image plane, no projection
+            points_2d[0, index] = np.nan
+            points_2d[1, index] = np.nan
+            continue
+
+        xx = (km[0, 0] * dx + km[0, 1] * dy + km[0, 2] * dz) / q2 * factor
+        yy = (km[1, 0] * dx + km[1, 1] * dy + km[1, 2] * dz) / q2 * factor
+
+        if flip:
+            yy = -yy
+
+        points_2d[0, index] = xx + offset[0]
+        points_2d[1, index] = yy + offset[1]
+
+@nb.jit(nopython = True, cache = True)
+def _get_visible_jit(
+    points_3d, points_2d, visible,
+    kpos, kn, r2, bounds,
+    ):
+
+    for index in range(0, points_3d.shape[1]):
+
+        x, y, z = points_3d[0, index], points_3d[1, index], points_3d[2, index]
+
+        # behind horizon plane of sphere with radius r as seen from camera
+        if x * kpos[0] + y * kpos[1] + z * kpos[2] <= r2:
+            visible[index] = False
+            continue
+
+        # behind camera
+        if (x - kpos[0]) * kn[0] + (y - kpos[1]) * kn[1] + (z - kpos[2]) * kn[2] <= 0.0:
+            visible[index] = False
+            continue
+
+        # outside of viewport (false for NaN)
+        visible[index] = (
+            bounds[0] <= points_2d[0, index] <= bounds[2]
+            and bounds[1] <= points_2d[1, index] <= bounds[3]
+            )
+
+@nb.jit(nopython = True, cache = True)
+def _split_lines_jit(visible, offsets, index, lines):
+
+    index_len = 0
+    lines_len = 0
+    lines[0] = 0
+
+    for line in range(0, offsets.shape[0] - 1):
+
+        run = 0
+
+        for vertex in range(offsets[line], offsets[line + 1] + 1):
+
+            if vertex < offsets[line + 1] and visible[vertex]:
+                index[index_len] = vertex
+                index_len += 1
+                run += 1
+                continue
+
+            # end of run: keep lines with at least two vertices
+            if run == 1:
+                index_len -= 1
+            elif run > 1:
+                lines_len += 1
+                lines[lines_len] = index_len
+            run = 0
+
+    return index_len, lines_len
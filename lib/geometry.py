@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    lib/geometry.py: Coordinate conversion and line geometry
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import math
+
+import numpy as np
+import numba as nb
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def polar_to_cart(polar, r, depth_factor = 0.0):
+
+    # polar: lon [deg], lat [deg] and optionally depth [km], shape (2 or 3, N)
+    lon = np.radians(polar[0, :].astype('f8'))
+    lat = np.radians(polar[1, :].astype('f8'))
+
+    if polar.shape[0] > 2 and depth_factor != 0.0:
+        length = r - polar[2, :].astype('f8') * (1000.0 * depth_factor)
+    else:
+        length = np.full(lon.shape, r, dtype = 'f8')
+
+    cart = np.zeros((3, lon.shape[0]), dtype = 'f4')
+    cos_lat = np.cos(lat)
+    cart[0, :] = length * cos_lat * np.cos(lon)
+    cart[1, :] = length * cos_lat * np.sin(lon)
+    cart[2, :] = length * np.sin(lat)
+
+    return cart
+
+def split_long_segments(vertices, offsets, max_distance):
+
+    # new lines start at original line starts and after segments longer than max_distance
+    distance = np.sqrt(np.sum((vertices[:, 1:] - vertices[:, :-1]).astype('f8') ** 2, axis = 0))
+    starts = np.union1d(offsets[:-1], np.nonzero(distance > max_distance)[0] + 1)
+    stops = np.append(starts[1:], offsets[-1])
+
+    # drop lines with less than two vertices
+    keep = (stops - starts) >= 2
+    starts, stops = starts[keep], stops[keep]
+    lengths = stops - starts
+
+    new_offsets = np.zeros((lengths.shape[0] + 1,), dtype = 'i8')
+    new_offsets[1:] = np.cumsum(lengths)
+
+    index = np.arange(new_offsets[-1], dtype = 'i8') + np.repeat(starts - new_offsets[:-1], lengths)
+
+    return vertices[:, index], new_offsets
+
+def simplify_lines(vertices, offsets, tolerance):
+
+    # Douglas-Peucker per line, end points are always kept
+    keep = np.zeros((vertices.shape[1],), dtype = 'bool')
+    _simplify_lines_jit(vertices, offsets, tolerance, keep)
+
+    new_offsets = np.zeros((keep.shape[0] + 1,), dtype = 'i8')
+    new_offsets[1:] = np.cumsum(keep)
+    new_offsets = new_offsets[offsets]
+
+    return vertices[:, keep], new_offsets
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@nb.jit(nopython = True, cache = True)
+def _segment_distance(vertices, a, b, index):
+
+    ax, ay, az = vertices[0, a], vertices[1, a], vertices[2, a]
+    dx, dy, dz = vertices[0, b] - ax, vertices[1, b] - ay, vertices[2, b] - az
+    px, py, pz = vertices[0, index] - ax, vertices[1, index] - ay, vertices[2, index] - az
+
+    length2 = dx * dx + dy * dy + dz * dz
+    if length2 > 0.0: # closed rings have a = b
+        t = min(max((px * dx + py * dy + pz * dz) / length2, 0.0), 1.0)
+        px, py, pz = px - t * dx, py - t * dy, pz - t * dz
+
+    return math.sqrt(px * px + py * py + pz * pz)
+
+@nb.jit(nopython = True, cache = True)
+def _simplify_lines_jit(vertices, offsets, tolerance, keep):
+
+    stack = np.zeros((vertices.shape[1] + 1, 2), dtype = np.int64)
+
+    for line in range(0, offsets.shape[0] - 1):
+
+        first, last = offsets[line], offsets[line + 1] - 1
+        if last < first:
+            continue
+        keep[first] = True
+        keep[last] = True
+
+        stack[0, 0], stack[0, 1] = first, last
+        top = 1
+
+        while top > 0:
+
+            top -= 1
+            a, b = stack[top, 0], stack[top, 1]
+
+            distance_max, index_max = -1.0, -1
+            for index in range(a + 1, b):
+                distance = _segment_distance(vertices, a, b, index)
+                if distance > distance_max:
+                    distance_max, index_max = distance, index
+
+            if distance_max > tolerance:
+                keep[index_max] = True
+                stack[top, 0], stack[top, 1] = a, index_max
+                stack[top + 1, 0], stack[top + 1, 1] = index_max, b
+                top += 2
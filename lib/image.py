@@ -28,9 +28,13 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import functools
 import math
+import sys
 
 import cairo
+import numpy as np
+import numba as nb
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS
@@ -45,10 +49,28 @@ class Image:
         self._ctx = cairo.Context(self._surface)
         self._set_background_color(background_color)
 
+    def get_bytes(self):
+
+        self._surface.flush()
+
+        return self._get_buffer()[:, :self._width * 4].tobytes()
+
     def save(self, fn):
 
         self._surface.write_to_png(fn)
 
+    def draw_raw(self,
+        data, width, height,
+        x = 0, y = 0,
+        ):
+
+        # pixels as returned by get_bytes of an image of width x height
+        self._surface.flush()
+        self._get_buffer()[y:y + height, x * 4:(x + width) * 4] = np.frombuffer(
+            data, dtype = 'u1',
+        ).reshape(height, width * 4)
+        self._surface.mark_dirty()
+
     def draw_polygon(self,
         *points,
         **kwargs,
@@ -60,6 +82,93 @@ class Image:
             self._ctx.line_to(*point)
         self._stroke(**kwargs)
 
+    def draw_points(self,
+        points_2d, radius = 1.0,
+        color = (1.0, 1.0, 1.0),
+        ):
+
+        colors = np.asarray(color, dtype = 'f4')
+        if colors.ndim == 1:
+            colors = colors[:, None] # one color for all points
+
+        stamps, radius_ceil = _get_disc_stamps(float(radius))
+
+        self._surface.flush()
+        _draw_points_jit(
+            self._get_buffer(), _CHANNELS, self._width,
+            points_2d, colors,
+            stamps, radius_ceil,
+            )
+        self._surface.mark_dirty()
+
+    def draw_density(self,
+        points_2d, weights, lut,
+        scale = 100.0,
+        ):
+
+        # per-pixel sum of weights, log tone-mapped to lut, saturating at scale
+        density = np.zeros((self._height, self._width), dtype = 'f4')
+        _accumulate_density_jit(points_2d, weights, density)
+
+        self._surface.flush()
+        _composite_density_jit(
+            self._get_buffer(), _CHANNELS,
+            density, np.ascontiguousarray(lut, dtype = 'f4'), np.float32(math.log1p(scale)),
+            )
+        self._surface.mark_dirty()
+
+    def draw_polylines(self,
+        points_2d, offsets,
+        **kwargs,
+        ):
+
+        points = points_2d.T.tolist()
+
+        for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+            pen_down = False
+            for x, y in points[start:stop]:
+                if math.isnan(x) or math.isnan(y):
+                    pen_down = False
+                elif pen_down:
+                    self._ctx.line_to(x, y)
+                else:
+                    self._ctx.move_to(x, y)
+                    pen_down = True
+
+        self._stroke(**kwargs)
+
+    def draw_filledcircles(self,
+        points_2d, r = 1.0,
+        fill_color = (1.0, 1.0, 1.0),
+        ):
+
+        for x, y in points_2d.T.tolist():
+            self._ctx.new_sub_path()
+            self._ctx.arc(
+                x, y, r,
+                0, 2 * math.pi, # 0 to 360°
+            )
+        self._ctx.set_source_rgb(*fill_color)
+        self._ctx.fill()
+
+    def draw_filledcircles_binned(self,
+        points_2d, bins, fill_colors, r = 1.0,
+        ):
+
+        # one path and one fill per bin, bins are drawn in ascending order
+        order = np.argsort(bins, kind = 'stable')
+        bins_sorted = bins[order]
+        starts = np.searchsorted(bins_sorted, np.arange(len(fill_colors)), side = 'left')
+        stops = np.searchsorted(bins_sorted, np.arange(len(fill_colors)), side = 'right')
+
+        for fill_color, start, stop in zip(fill_colors, starts, stops):
+            if start == stop:
+                continue
+            self.draw_filledcircles(
+                points_2d[:, order[start:stop]], r = r,
+                fill_color = fill_color,
+            )
+
     def draw_filledcircle(self,
         x = 0.0, y = 0.0, r = 1.0,
         fill_color = (1.0, 1.0, 1.0),
@@ -82,6 +191,14 @@ class Image:
         self._ctx.set_line_width(line_width)
         self._ctx.stroke()
 
+    def _get_buffer(self):
+
+        return np.ndarray(
+            shape = (self._height, self._surface.get_stride()),
+            dtype = 'u1',
+            buffer = self._surface.get_data(),
+            )
+
     def _set_background_color(self,
         fill_color = (1.0, 1.0, 1.0),
         ):
@@ -89,3 +206,124 @@ class Image:
         self._ctx.set_source_rgb(*fill_color)
         self._ctx.rectangle(0, 0, self._width, self._height)
         self._ctx.fill()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# byte offsets of R, G and B within a native-endian FORMAT_RGB24 pixel
+_CHANNELS = np.array((2, 1, 0) if sys.byteorder == 'little' else (1, 2, 3), dtype = 'i8')
+
+# matching ffmpeg pixel format for raw frames from Image.get_bytes
+PIX_FMT = 'bgr0' if sys.byteorder == 'little' else '0rgb'
+
+_SUBPIXELS = 4 # stamp positions per pixel and axis
+_SUPERSAMPLING = 16 # coverage samples per pixel and axis
+
+@functools.lru_cache(maxsize = None)
+def _get_disc_stamps(radius):
+
+    radius_ceil = math.ceil(radius)
+    size = 2 * radius_ceil + 2
+
+    # sample positions within stamp, pixel (i, j) covers [i, i + 1) x [j, j + 1)
+    samples = (np.arange(size * _SUPERSAMPLING) + 0.5) / _SUPERSAMPLING
+    offsets = radius_ceil + (np.arange(_SUBPIXELS) + 0.5) / _SUBPIXELS
+
+    stamps = np.zeros((_SUBPIXELS, _SUBPIXELS, size, size), dtype = 'f4')
+    for sy, oy in enumerate(offsets):
+        for sx, ox in enumerate(offsets):
+            inside = (
+                (samples[None, :] - ox) ** 2 + (samples[:, None] - oy) ** 2
+            ) <= radius ** 2
+            stamps[sy, sx] = inside.reshape(
+                size, _SUPERSAMPLING, size, _SUPERSAMPLING
+            ).mean(axis = (1, 3))
+
+    return stamps, radius_ceil
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@nb.jit(nopython = True, cache = True)
+def _draw_points_jit(
+    data, channels, width,
+    points_2d, colors,
+    stamps, radius_ceil,
+    ):
+
+    height = data.shape[0]
+    subpixels = stamps.shape[0]
+    size = stamps.shape[2]
+
+    for index in range(0, points_2d.shape[1]):
+
+        x, y = points_2d[0, index], points_2d[1, index]
+        if not (math.isfinite(x) and math.isfinite(y)):
+            continue
+
+        x_floor, y_floor = math.floor(x), math.floor(y)
+        sx = min(int((x - x_floor) * subpixels), subpixels - 1)
+        sy = min(int((y - y_floor) * subpixels), subpixels - 1)
+        x0 = int(x_floor) - radius_ceil
+        y0 = int(y_floor) - radius_ceil
+
+        color_index = index if colors.shape[1] > 1 else 0
+
+        for j in range(0, size):
+            py = y0 + j
+            if py < 0 or py >= height:
+                continue
+            for i in range(0, size):
+                px = x0 + i
+                if px < 0 or px >= width:
+                    continue
+                alpha = stamps[sy, sx, j, i]
+                if alpha == 0.0:
+                    continue
+                for channel in range(0, 3):
+                    offset = px * 4 + channels[channel]
+                    data[py, offset] = np.uint8(
+                        data[py, offset] * (1.0 - alpha)
+                        + colors[channel, color_index] * 255.0 * alpha
+                        + 0.5
+                        )
+
+@nb.jit(nopython = True, cache = True)
+def _accumulate_density_jit(points_2d, weights, density):
+
+    height, width = density.shape
+
+    for index in range(0, points_2d.shape[1]):
+
+        x, y = points_2d[0, index], points_2d[1, index]
+        if not (math.isfinite(x) and math.isfinite(y)):
+            continue
+
+        px, py = int(math.floor(x)), int(math.floor(y))
+        if 0 <= px < width and 0 <= py < height:
+            density[py, px] += weights[index]
+
+@nb.jit(nopython = True, cache = True)
+def _composite_density_jit(data, channels, density, lut, scale_log):
+
+    height, width = density.shape
+    lut_max = lut.shape[0] - 1
+
+    for py in range(0, height):
+        for px in range(0, width):
+
+            if density[py, px] <= 0.0:
+                continue
+
+            value = min(math.log1p(density[py, px]) / scale_log, 1.0)
+            lut_index = int(value * lut_max)
+
+            for channel in range(0, 3):
+                offset = px * 4 + channels[channel]
+                data[py, offset] = np.uint8(
+                    data[py, offset] * (1.0 - value)
+                    + lut[lut_index, channel] * 255.0 * value
+                    + 0.5
+                    )
@@ -29,9 +29,13 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import json
+import os
 
+import numpy as np
 import requests
 
+from .geometry import polar_to_cart, simplify_lines, split_long_segments
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # API
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -42,6 +46,23 @@ def fetch_osm(path, url):
     with open(path, 'w', encoding = 'utf-8') as f:
         f.write(r.text)
 
+def load_osm(path, r):
+
+    with open(os.path.join(path, 'meta.json'), 'r', encoding = 'utf-8') as f:
+        meta = json.load(f)
+
+    scale = r / meta['radius']
+    levels = []
+
+    for level, tolerance in enumerate(meta['tolerances']):
+        vertices = np.load(os.path.join(path, f'vertices_{level:d}.npy'), mmap_mode = 'r')
+        offsets = np.load(os.path.join(path, f'offsets_{level:d}.npy'), mmap_mode = 'r')
+        if scale != 1.0:
+            vertices = vertices * np.float32(scale)
+        levels.append((tolerance * scale, vertices, offsets))
+
+    return levels
+
 def read_osm(path):
 
     with open(path, 'r', encoding = 'utf-8') as f:
@@ -50,10 +71,54 @@ def read_osm(path):
 
     return _coordinates_from_geojson(data)
 
+def reencode_osm(src, target, r, max_distance, tolerances = ()):
+
+    polar, offsets = _flatten_geometries(read_osm(src))
+    vertices, offsets = split_long_segments(polar_to_cart(polar, r), offsets, max_distance)
+
+    # level 0 is full resolution, levels are simplified with increasing tolerance
+    tolerances = [0.0] + sorted(tolerances)
+
+    os.makedirs(target, exist_ok = True)
+    for level, tolerance in enumerate(tolerances):
+        level_vertices, level_offsets = simplify_lines(vertices, offsets, tolerance) if level > 0 else (vertices, offsets)
+        _save_array(os.path.join(target, f'vertices_{level:d}.npy'), level_vertices)
+        _save_array(os.path.join(target, f'offsets_{level:d}.npy'), level_offsets)
+    with open(os.path.join(target, 'meta.json'), 'w', encoding = 'utf-8') as f:
+        json.dump(dict(
+            radius = r,
+            max_distance = max_distance,
+            tolerances = tolerances,
+            source = os.path.basename(src),
+        ), f)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _flatten_geometries(geometries):
+
+    lines = [
+        subpoly
+        for collection in geometries
+        for poly in collection
+        for subpoly in poly
+    ]
+
+    offsets = np.zeros((len(lines) + 1,), dtype = 'i8')
+    offsets[1:] = np.cumsum([len(line) for line in lines])
+
+    vertices = np.array([point for line in lines for point in line], dtype = 'f8').T
+
+    return vertices, offsets
+
+def _save_array(fn, array):
+
+    tmp = fn + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, fn)
+
 def _coordinates_from_geojson(geojson):
     return [
         geom['coordinates']
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    lib/shared.py: Sharing read-only arrays between processes
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class SharedArrays:
+
+    def __init__(self):
+
+        self._segments = []
+        self._descriptors = {}
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    @property
+    def descriptors(self):
+
+        return self._descriptors.copy()
+
+    def add(self, name, array):
+
+        array = np.asarray(array)
+
+        segment = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+        self._segments.append(segment)
+
+        shared = np.ndarray(array.shape, dtype = array.dtype, buffer = segment.buf)
+        shared[...] = array
+
+        self._descriptors[name] = (segment.name, array.shape, array.dtype.str)
+
+    def close(self):
+
+        while len(self._segments) > 0:
+            segment = self._segments.pop()
+            segment.close()
+            segment.unlink()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def attach_shared_arrays(descriptors):
+
+    arrays = {}
+
+    for name, (segment_name, shape, dtype) in descriptors.items():
+        segment = shared_memory.SharedMemory(name = segment_name)
+        _attached.append(segment) # keep mapping alive for the lifetime of the process
+        array = np.ndarray(shape, dtype = dtype, buffer = segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+
+    return arrays
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_attached = []
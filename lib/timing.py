@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    lib/timing.py: Per-frame render stage timing
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import csv
+import json
+import time
+
+import numpy as np
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+PERCENTILES = (50, 90, 99)
+
+SLOWEST = 10 # number of slowest frames in report
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class Stopwatch:
+
+    def __init__(self, enabled = True):
+
+        self._enabled = enabled
+        self._stages = {}
+        self._counts = {}
+        self._last = 0.0
+
+    def start(self):
+
+        if not self._enabled:
+            return
+
+        self._stages, self._counts = {}, {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+
+        # time since start or previous lap, accumulated per stage
+        if not self._enabled:
+            return
+
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, name, value):
+
+        if not self._enabled:
+            return
+
+        self._counts[name] = self._counts.get(name, 0) + int(value)
+
+    def pop(self):
+
+        if not self._enabled:
+            return None
+
+        record = dict(stages = self._stages, counts = self._counts)
+        self._stages, self._counts = {}, {}
+
+        return record
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def write_timing_report(prefix, records):
+
+    # records: frame index -> record from Stopwatch.pop
+    frame_indexes = sorted(records.keys())
+    stages = _get_names(records, 'stages')
+    counts = _get_names(records, 'counts')
+
+    stage_values = {
+        stage: np.array([records[frame_index]['stages'].get(stage, 0.0) for frame_index in frame_indexes])
+        for stage in stages
+    }
+    count_values = {
+        name: np.array([records[frame_index]['counts'].get(name, 0) for frame_index in frame_indexes])
+        for name in counts
+    }
+    total = np.sum(list(stage_values.values()), axis = 0) if len(stages) > 0 else np.zeros((len(frame_indexes),))
+
+    slowest = np.argsort(total, kind = 'stable')[::-1][:SLOWEST]
+
+    report = dict(
+        frames = len(frame_indexes),
+        stages = {stage: _get_stats(values) for stage, values in stage_values.items()},
+        total = _get_stats(total),
+        counts = {name: _get_stats(values) for name, values in count_values.items()},
+        slowest = [
+            dict(
+                frame = frame_indexes[index],
+                total = float(total[index]),
+                stages = records[frame_indexes[index]]['stages'],
+                counts = records[frame_indexes[index]]['counts'],
+            )
+            for index in slowest
+        ],
+    )
+
+    with open(f'{prefix:s}.json', 'w', encoding = 'utf-8') as f:
+        json.dump(report, f, indent = 2)
+
+    with open(f'{prefix:s}.csv', 'w', encoding = 'utf-8', newline = '') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'total'] + stages + counts)
+        for index, frame_index in enumerate(frame_indexes):
+            writer.writerow(
+                [frame_index, float(total[index])]
+                + [float(stage_values[stage][index]) for stage in stages]
+                + [int(count_values[name][index]) for name in counts]
+            )
+
+    return report
+
+def print_timing_report(report):
+
+    print(f'Timing of {report["frames"]:d} frames [ms]:')
+    header = ''.join(f'{f"p{percentile:d}":>10s}' for percentile in PERCENTILES)
+    print(f'{"stage":<20s}{"mean":>10s}{header:s}{"max":>10s}')
+    for stage, stats in list(report['stages'].items()) + [('total', report['total'])]:
+        values = ''.join(f'{stats[f"p{percentile:d}"] * 1e3:10.2f}' for percentile in PERCENTILES)
+        print(f'{stage:<20s}{stats["mean"] * 1e3:10.2f}{values:s}{stats["max"] * 1e3:10.2f}')
+    print('Slowest frames: ' + ', '.join(
+        f'{item["frame"]:d} ({item["total"] * 1e3:.1f})' for item in report['slowest']
+    ))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_names(records, kind):
+
+    # in order of first appearance, i.e. in order of stages within a frame
+    names = {}
+    for record in records.values():
+        for name in record[kind].keys():
+            names.setdefault(name, None)
+
+    return list(names.keys())
+
+def _get_stats(values):
+
+    if values.shape[0] == 0:
+        return dict(mean = 0.0, max = 0.0, **{f'p{percentile:d}': 0.0 for percentile in PERCENTILES})
+
+    stats = dict(
+        mean = float(np.mean(values)),
+        max = float(np.max(values)),
+    )
+    for percentile in PERCENTILES:
+        stats[f'p{percentile:d}'] = float(np.percentile(values, percentile))
+
+    return stats
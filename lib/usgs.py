@@ -28,51 +28,207 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import concurrent.futures
+import csv
 import datetime
+import functools
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
 import os
 import random
-import re
+import time
 
 import requests
 import tqdm
 
+import numpy as np
 import zarr
 from numcodecs import Blosc
 
+from .geometry import polar_to_cart
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+USGS_URL = 'https://earthquake.usgs.gov/fdsnws/event/1/query'
+USGS_LIMIT = 20000 # max. number of events per query
+
+FIELDS = ['lon', 'lat', 'depth', 'mag', 'horizontalError', 'depthError', 'magError']
+
+_CHUNK = 10000 # zarr chunk length
+
+_WINDOW_FMT = '%Y-%m-%dT%H%M%S'
+
+_INDEX_SLAB = 7 * 24 * 3600 * 1000 # time slab length of bucket index [ms]
+_INDEX_BANDS = 16 # equal-area latitude bands of bucket index
+_INDEX_SECTORS = 32 # longitude sectors per band of bucket index
+
+_COLUMNS = {
+    'lon': 'longitude',
+    'lat': 'latitude',
+    'depth': 'depth',
+    'mag': 'mag',
+    'horizontalError': 'horizontalError',
+    'depthError': 'depthError',
+    'magError': 'magError',
+}
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class UsgsIndex:
+
+    def __init__(self, path):
+
+        usgs_zarr = zarr.open(path, 'r')
+        meta = usgs_zarr.attrs['index']
+
+        self._slab = meta['slab']
+        self._slab_first = meta['slab_first']
+        self._cells = meta['bands'] * meta['sectors']
+        self._centers, self._radii = _get_index_caps(meta['bands'], meta['sectors'])
+
+        # bucket (slab major, cell minor) boundaries into order, order is read per query
+        self._offsets = usgs_zarr['index_offsets'][:]
+        self._order = usgs_zarr['index_order']
+        self._slabs = (self._offsets.shape[0] - 1) // self._cells
+
+    def query(self, time_start, time_end, position, r):
+
+        # half-open ranges of quakes in store which may lie within [time_start, time_end)
+        # and on the part of the sphere with radius r visible from position
+        slab_start = max(int(time_start) // self._slab - self._slab_first, 0)
+        slab_stop = min((int(time_end) - 1) // self._slab - self._slab_first + 1, self._slabs)
+        if slab_stop <= slab_start:
+            return np.zeros((0,), dtype = 'i8'), np.zeros((0,), dtype = 'i8')
+
+        cells = self._get_visible_cells(position, r)
+        keys = (np.arange(slab_start, slab_stop)[:, None] * self._cells + cells[None, :]).reshape(-1)
+
+        base = self._offsets[slab_start * self._cells]
+        order = self._order[base:self._offsets[slab_stop * self._cells]] # only chunks of relevant slabs
+        starts = self._offsets[keys] - base
+        lengths = self._offsets[keys + 1] - base - starts
+
+        index = np.sort(order[
+            np.arange(lengths.sum(), dtype = 'i8')
+            + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        ])
+
+        if index.shape[0] == 0:
+            return index, index
+
+        # merge consecutive quakes into ranges
+        breaks = np.nonzero(np.diff(index) != 1)[0] + 1
+
+        return index[np.insert(breaks, 0, 0)], index[np.append(breaks, index.shape[0]) - 1] + 1
+
+    def _get_visible_cells(self, position, r):
+
+        position = np.asarray(position, dtype = 'f8')
+        distance = np.linalg.norm(position)
+        if distance <= r:
+            return np.arange(self._cells, dtype = 'i8')
+
+        # cells whose bounding cap reaches beyond the horizon as seen from position,
+        # quakes below the surface have a closer horizon
+        horizon = math.acos(r / distance)
+        angles = np.arccos(np.clip(position @ self._centers / distance, -1.0, 1.0))
+
+        return np.nonzero(angles <= horizon + self._radii)[0]
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # API
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def fetch_usgs(fld, a, b):
+def fetch_usgs(
+    fld, a, b,
+    connections = 8, retries = 5, timeout = 60.0, url = USGS_URL,
+    limit = USGS_LIMIT, max_window = datetime.timedelta(days = 64),
+    ):
 
-    for d1, d2 in _date_interval_range(a, b):
-        dst = os.path.join(fld, f'{d1[0]:04d}-{d1[1]:02d}-{d1[2]:02d}.csv')
-        if os.path.exists(dst):
-            print("skip " + dst)
-            continue
-        r = requests.get(
-            'https://earthquake.usgs.gov/fdsnws/event/1/query?format=csv&'
-            f'starttime={d1[0]:04d}-{d1[1]:02d}-{d1[2]:02d}&endtime={d2[0]:04d}-{d2[1]:02d}-{d2[2]:02d}'
-        )
-        tmp = dst + '-{:08d}'.format(random.randint(0, 9999999))
-        with open(tmp, 'w', encoding = 'utf-8') as f:
-            f.write(r.text)
-        os.rename(tmp, dst)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = connections)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
 
-def reencode_usgs(src_fld, target):
+    with session, concurrent.futures.ThreadPoolExecutor(max_workers = connections) as pool:
 
-    usgs_data_raw = []
+        # windows are fetched while the following ones are still being planned
+        futures = [
+            pool.submit(
+                _fetch_usgs_csv,
+                session, url, _window_params('csv', start, end),
+                os.path.join(fld, _window_fn(start, end)),
+                retries, timeout,
+            )
+            for start, end in _plan_windows(
+                session, url,
+                _date(a), _date(b), _fetched_intervals(fld),
+                limit, max_window, retries, timeout,
+            )
+        ]
+        for future in tqdm.tqdm(concurrent.futures.as_completed(futures), total = len(futures)):
+            future.result()
 
-    for fn in tqdm.tqdm(os.listdir(src_fld)):
-        if not fn.endswith('.csv'):
-            continue
-        usgs_data_raw.extend( _read_usgs_csv( os.path.join(src_fld, fn) ) )
+def load_usgs_cart(path, r, depth_factor):
+
+    usgs_zarr = zarr.open(path, 'r')
+
+    store_hash = usgs_zarr.attrs.get('hash', None)
+    if store_hash is None: # store written before hashes were recorded
+        store_hash = _chain_hash('', 0, usgs_zarr['time'][:], usgs_zarr['data'][:, :])
+    key = hashlib.sha256(json.dumps([r, depth_factor, store_hash]).encode('utf-8')).hexdigest()[:16]
+
+    cache_fld = os.path.splitext(path)[0] + '.cache'
+    fn = os.path.join(cache_fld, f'cart_{key:s}.npy')
+
+    if not os.path.exists(fn):
+        os.makedirs(cache_fld, exist_ok = True)
+        for old_fn in os.listdir(cache_fld):
+            if old_fn.startswith('cart_') and old_fn.endswith('.npy'):
+                os.remove(os.path.join(cache_fld, old_fn))
+        cart = polar_to_cart(usgs_zarr['data'][:3, :], r, depth_factor)
+        tmp = fn + '-{:08d}'.format(random.randint(0, 9999999))
+        with open(tmp, 'wb') as f:
+            np.save(f, cart)
+        os.rename(tmp, fn)
+
+    return np.load(fn, mmap_mode = 'r')
+
+def reencode_usgs(src_fld, target, chunk_size = 100000, workers = 1, incremental = False):
 
-    usgs_data = [quake for quake in usgs_data_raw if _quake_ok(quake)]
-    print(f'Quakes ok={len(usgs_data):d} broken={len(usgs_data_raw)-len(usgs_data):d}')
+    # files are named by start time, i.e. sorting by name sorts by time
+    fns = sorted(fn for fn in os.listdir(src_fld) if fn.endswith('.csv'))
 
-    usgs_data.sort(key = lambda x: x['time'])
+    if incremental and os.path.exists(target) and 'sources' not in zarr.open(target, 'r').attrs:
+        print('Store does not record its source files, rebuilding')
+        incremental = False
 
+    if incremental and os.path.exists(target):
+        usgs_zarr = zarr.open(target, 'r+')
+        sources = set(usgs_zarr.attrs['sources'])
+        new_fns = [fn for fn in fns if fn not in sources]
+        if len(new_fns) == 0:
+            print('Quakes up to date')
+            return
+        usgs_time, usgs_data = _read_usgs_csvs(src_fld, new_fns, chunk_size, workers)
+        start = _append_usgs_zarr(usgs_zarr, usgs_time, usgs_data)
+        usgs_zarr.attrs['sources'] = sorted(sources | set(new_fns))
+        _update_usgs_index(usgs_zarr, start)
+        return
+
+    usgs_time, usgs_data = _read_usgs_csvs(src_fld, fns, chunk_size, workers)
+    write_usgs_zarr(target, usgs_time, usgs_data, sources = fns)
+
+def write_usgs_zarr(target, usgs_time, usgs_data, sources = ()):
+
+    # usgs_time: epoch ms sorted ascending, usgs_data: FIELDS x N
     usgs_zarr = zarr.open(
         target,
         'w',
@@ -80,76 +236,363 @@ def reencode_usgs(src_fld, target):
 
     usgs_zarr.zeros(
         'time',
-        shape = (len(usgs_data),),
-        chunks = (10000,),
+        shape = usgs_time.shape,
+        chunks = (_CHUNK,),
         dtype = 'u8',
         compressor = Blosc(cname = 'lz4'),
     )
-    usgs_zarr['time'][:] = [int(quake['time'].timestamp() * 1000) for quake in usgs_data]
+    usgs_zarr['time'][:] = usgs_time
 
-    fields = ['lon', 'lat', 'depth', 'mag', 'horizontalError', 'depthError', 'magError']
     usgs_zarr.zeros(
         'data',
-        shape = (len(fields), len(usgs_data)),
-        chunks = (len(fields), 10000,),
+        shape = usgs_data.shape,
+        chunks = (len(FIELDS), _CHUNK,),
         dtype = 'f4',
         compressor = Blosc(cname = 'lz4'),
     )
-    usgs_zarr.attrs['fields'] = fields
-    for field_index, field in enumerate(fields):
-        usgs_zarr['data'][field_index, :] = [quake[field] for quake in usgs_data]
+    usgs_zarr.attrs['fields'] = FIELDS
+    usgs_zarr['data'][:, :] = usgs_data
+
+    usgs_zarr.attrs['sources'] = list(sources)
+    usgs_zarr.attrs['hash'] = _chain_hash('', 0, usgs_time, usgs_data)
+
+    _write_usgs_index(usgs_zarr, usgs_time, usgs_data[:2, :])
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def _date_interval_range(a, b):
+def _date(d):
+
+    return datetime.datetime(*d)
+
+def _fetched_intervals(fld):
+
+    intervals = []
 
-    A = datetime.datetime.strptime(f'{a[0]:04d}-{a[1]:02d}-{a[2]:02d}', '%Y-%m-%d')
-    B = datetime.datetime.strptime(f'{b[0]:04d}-{b[1]:02d}-{b[2]:02d}', '%Y-%m-%d')
+    for fn in os.listdir(fld):
+        if not fn.endswith('.csv'):
+            continue
+        name = fn[:-4]
+        if '_' in name: # adaptive window
+            start, end = (datetime.datetime.strptime(part, _WINDOW_FMT) for part in name.split('_'))
+        else: # legacy day file
+            start = datetime.datetime.strptime(name, '%Y-%m-%d')
+            end = start + datetime.timedelta(days = 1)
+        intervals.append((start, end))
+
+    return sorted(intervals)
+
+def _plan_windows(session, url, a, b, fetched, limit, max_window, retries, timeout):
+
+    # grow windows while quiet, halve them while the service limit is exceeded
+    min_window = datetime.timedelta(seconds = 1)
+    window = datetime.timedelta(days = 1)
+    cursor = a
+
+    while cursor < b:
+
+        end = min(cursor + window, b)
+        for fetched_start, fetched_end in fetched:
+            if fetched_start <= cursor < fetched_end:
+                end = None
+                cursor = fetched_end
+                break
+            if cursor < fetched_start < end:
+                end = fetched_start
+        if end is None:
+            continue
 
-    for c1, c2 in zip( range(0, (B - A).days), range(1, (B - A).days + 1) ):
-        C1 = A + datetime.timedelta(days = c1)
-        C2 = A + datetime.timedelta(days = c2)
-        yield (C1.year, C1.month, C1.day), (C2.year, C2.month, C2.day)
+        count = int(_get_with_retry(session, url, _window_params('count', cursor, end), retries, timeout))
 
-def _parse_date_str(date_str):
-    if '1970-01-01T00:00:00.0Z' == date_str:
-        date_str = '1970-01-01T00:00:00.000Z'
-    return datetime.datetime.fromisoformat(
-        date_str[:-1] + '+00:00'
+        if count > limit and end - cursor > min_window:
+            window = max(datetime.timedelta(seconds = (end - cursor).total_seconds() // 2), min_window)
+            continue
+        if count > limit:
+            print(f'Warning: {count:d} quakes in {cursor.isoformat()} exceed limit of {limit:d}')
+
+        yield cursor, end
+        cursor = end
+
+        if count < limit // 2:
+            window = min(window * 2, max_window)
+
+def _window_fn(start, end):
+
+    return f'{start.strftime(_WINDOW_FMT):s}_{end.strftime(_WINDOW_FMT):s}.csv'
+
+def _window_params(fmt, start, end):
+
+    return dict(
+        format = fmt,
+        starttime = start.isoformat(),
+        endtime = end.isoformat(),
     )
 
-def _read_usgs_csv(fn):
+def _append_usgs_zarr(usgs_zarr, usgs_time, usgs_data):
 
-    with open(fn, 'r', encoding = 'utf-8') as f:
-        header = _split( next(f).strip('\n') )
-        out = [
-            {
-                k: v for k, v in zip(header, _split(line.strip('\n')))
-            }
-            for line in f
-            if len(line.strip()) != 0
-        ]
-    return [
-        {
-            'time': _parse_date_str(q['time']),
-            'lat': float(q['latitude']) if len(q['latitude']) != 0 else None,
-            'lon': float(q['longitude']) if len(q['longitude']) != 0 else None,
-            'depth': float(q['depth']) if len(q['depth']) != 0 else None,
-            'mag': float(q['mag']) if len(q['mag']) != 0 else None,
-            'horizontalError': float(q['horizontalError']) if len(q['horizontalError']) != 0 else None,
-            'depthError': float(q['depthError']) if len(q['depthError']) != 0 else None,
-            'magError': float(q['magError']) if len(q['magError']) != 0 else None,
-        }
-        for q in out
-    ]
-
-def _quake_ok(quake):
-    return all([
-        quake['lat'] is not None,
-        quake['lon'] is not None,
-        quake['depth'] is not None,
-    ])
-
-_split = lambda x: re.split(''',(?=(?:[^'"]|'[^']*'|"[^"]*")*$)''', x)
+    length = usgs_zarr['time'].shape[0]
+    appended = usgs_time.shape[0]
+
+    if length == 0 or usgs_time.shape[0] == 0 or usgs_zarr['time'][-1] <= usgs_time[0]:
+        start = length
+    else:
+        # out of order: merge with the existing tail, starting at the first affected chunk
+        start = int(np.searchsorted(usgs_zarr['time'][:], usgs_time[0], side = 'right'))
+        start = start // _CHUNK * _CHUNK
+        usgs_time, usgs_data = _concatenate_columns([
+            (usgs_zarr['time'][start:].astype('i8'), usgs_zarr['data'][:, start:]),
+            (usgs_time, usgs_data),
+        ])
+        order = np.argsort(usgs_time, kind = 'stable')
+        usgs_time, usgs_data = usgs_time[order], usgs_data[:, order]
+
+    print(f'Quakes appended={appended:d} rewritten={length - start:d}')
+
+    usgs_zarr['time'].resize(start + usgs_time.shape[0])
+    usgs_zarr['data'].resize(len(FIELDS), start + usgs_time.shape[0])
+    usgs_zarr['time'][start:] = usgs_time
+    usgs_zarr['data'][:, start:] = usgs_data
+
+    usgs_zarr.attrs['hash'] = _chain_hash(usgs_zarr.attrs.get('hash', ''), start, usgs_time, usgs_data)
+
+    return start
+
+def _chain_hash(previous, start, usgs_time, usgs_data):
+
+    # content hash of the store, chained over incremental updates
+    h = hashlib.sha256()
+    h.update(f'{previous:s}:{start:d}:'.encode('utf-8'))
+    h.update(np.ascontiguousarray(usgs_time, dtype = 'u8').tobytes())
+    h.update(np.ascontiguousarray(usgs_data, dtype = 'f4').tobytes())
+
+    return h.hexdigest()
+
+def _get_index_cells(lonlat, bands, sectors):
+
+    # bands are equidistant in sin(lat), i.e. all cells have the same area
+    z = np.sin(np.radians(lonlat[1, :].astype('f8')))
+    band = np.clip(np.floor((z + 1.0) / 2.0 * bands).astype('i8'), 0, bands - 1)
+    sector = np.floor((lonlat[0, :].astype('f8') + 180.0) / 360.0 * sectors).astype('i8') % sectors
+
+    return band * sectors + sector
+
+@functools.lru_cache(maxsize = None)
+def _get_index_caps(bands, sectors):
+
+    # center and angular radius of a cap covering each cell, cell extremes are corners
+    z = np.linspace(-1.0, 1.0, bands + 1)
+    lat_edges = np.degrees(np.arcsin(z))
+    lat_centers = np.degrees(np.arcsin((z[:-1] + z[1:]) / 2.0))
+    lon_edges = np.linspace(-180.0, 180.0, sectors + 1)
+    lon_centers = (lon_edges[:-1] + lon_edges[1:]) / 2.0
+
+    centers = polar_to_cart(np.stack([
+        np.tile(lon_centers, bands), np.repeat(lat_centers, sectors),
+    ]), 1.0).astype('f8')
+    radii = np.zeros((bands * sectors,), dtype = 'f8')
+    for lat in (lat_edges[:-1], lat_edges[1:]):
+        for lon in (lon_edges[:-1], lon_edges[1:]):
+            corners = polar_to_cart(np.stack([
+                np.tile(lon, bands), np.repeat(lat, sectors),
+            ]), 1.0).astype('f8')
+            radii = np.maximum(radii, np.arccos(np.clip(np.sum(centers * corners, axis = 0), -1.0, 1.0)))
+
+    return centers, radii + 1e-4 # margin for single precision corners
+
+def _get_index_buckets(usgs_time, lonlat, slab_first):
+
+    # bucket of each quake by time slab (relative to slab_first) and sky cell,
+    # order sorts quakes by bucket, time order within buckets
+    cells = _INDEX_BANDS * _INDEX_SECTORS
+    slabs = usgs_time.astype('i8') // _INDEX_SLAB - slab_first
+    slab_len = int(slabs[-1]) + 1 if slabs.shape[0] > 0 else 0
+
+    keys = slabs * cells + _get_index_cells(lonlat, _INDEX_BANDS, _INDEX_SECTORS)
+    order = np.argsort(keys, kind = 'stable')
+    counts = np.bincount(keys, minlength = slab_len * cells)
+
+    return order, counts
+
+def _update_usgs_index(usgs_zarr, start):
+
+    # quakes before store position start are unchanged, and so are the buckets of all slabs
+    # before the one holding start: only later buckets are rebuilt
+    cells = _INDEX_BANDS * _INDEX_SECTORS
+    length = usgs_zarr['time'].shape[0]
+    meta = usgs_zarr.attrs.get('index', None)
+
+    if meta is None or length == 0 or (meta['slab'], meta['bands'], meta['sectors']) != (
+        _INDEX_SLAB, _INDEX_BANDS, _INDEX_SECTORS,
+    ):
+        _write_usgs_index(usgs_zarr, usgs_zarr['time'][:], usgs_zarr['data'][:2, :])
+        return
+    if start >= length:
+        return
+
+    offsets = usgs_zarr['index_offsets'][:]
+    slab = int(usgs_zarr['time'][start]) // _INDEX_SLAB - meta['slab_first']
+    if offsets.shape[0] == 1 or slab < 0: # empty index or quakes before its first slab
+        _write_usgs_index(usgs_zarr, usgs_zarr['time'][:], usgs_zarr['data'][:2, :])
+        return
+    slab = min(slab, (offsets.shape[0] - 1) // cells)
+    base = int(offsets[slab * cells]) # quakes in earlier slabs, all before start
+
+    order, counts = _get_index_buckets(
+        usgs_zarr['time'][base:], usgs_zarr['data'][:2, base:], meta['slab_first'] + slab,
+    )
+
+    usgs_zarr['index_order'].resize(length)
+    usgs_zarr['index_order'][base:] = base + order
+    usgs_zarr['index_offsets'].resize(slab * cells + counts.shape[0] + 1)
+    usgs_zarr['index_offsets'][slab * cells + 1:] = base + np.cumsum(counts)
+
+def _write_usgs_index(usgs_zarr, usgs_time, lonlat):
+
+    slab_first = int(usgs_time[0]) // _INDEX_SLAB if usgs_time.shape[0] > 0 else 0
+    order, counts = _get_index_buckets(usgs_time, lonlat, slab_first)
+    offsets = np.zeros((counts.shape[0] + 1,), dtype = 'i8')
+    offsets[1:] = np.cumsum(counts)
+
+    for name, array in (('index_order', order), ('index_offsets', offsets)):
+        usgs_zarr.array(
+            name, array,
+            chunks = (_CHUNK,),
+            dtype = 'i8',
+            compressor = Blosc(cname = 'lz4'),
+            overwrite = True,
+        )
+    usgs_zarr.attrs['index'] = dict(
+        slab = _INDEX_SLAB,
+        slab_first = slab_first,
+        bands = _INDEX_BANDS,
+        sectors = _INDEX_SECTORS,
+    )
+
+def _fetch_usgs_csv(session, url, params, dst, retries, timeout):
+
+    text = _get_with_retry(session, url, params, retries, timeout)
+
+    if len(text) != 0 and not text.startswith('time,'): # empty if no quakes
+        raise ValueError(f'unexpected response for {params}: {text[:100]!r}')
+
+    tmp = dst + '-{:08d}'.format(random.randint(0, 9999999))
+    with open(tmp, 'w', encoding = 'utf-8') as f:
+        f.write(text)
+    os.rename(tmp, dst)
+
+def _get_with_retry(session, url, params, retries, timeout, backoff = 1.0):
+
+    for attempt in range(retries + 1):
+
+        try:
+            r = session.get(url, params = params, timeout = timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            if attempt == retries:
+                raise
+        else:
+            if r.status_code == 204: # no quakes
+                return ''
+            if r.status_code < 500 or attempt == retries:
+                r.raise_for_status()
+                # body must be complete unless it was transferred compressed
+                if 'Content-Length' in r.headers and 'Content-Encoding' not in r.headers:
+                    if len(r.content) != int(r.headers['Content-Length']):
+                        raise ValueError(f'incomplete response for {params}')
+                return r.text
+
+        time.sleep(backoff * 2 ** attempt)
+
+def _concatenate_columns(parts):
+
+    return (
+        np.concatenate([part[0] for part in parts] + [np.zeros((0,), dtype = 'i8')]),
+        np.concatenate([part[1] for part in parts] + [np.zeros((len(FIELDS), 0), dtype = 'f4')], axis = 1),
+    )
+
+def _parse_rows(rows, time_column, columns):
+
+    # "2019-12-31T23:59:58.123Z" -> epoch ms, time zone suffix is always UTC
+    usgs_time = np.array(
+        [row[time_column][:-1] for row in rows],
+        dtype = 'datetime64[ms]',
+    ).astype('i8')
+
+    # empty fields become NaN
+    data = np.zeros((len(columns), len(rows)), dtype = 'f4')
+    for field_index, column in enumerate(columns):
+        data[field_index, :] = np.array(
+            [row[column] or 'nan' for row in rows],
+            dtype = 'f8',
+        )
+
+    return usgs_time, data
+
+def _read_usgs_csv(fn, chunk_size):
+
+    with open(fn, 'r', encoding = 'utf-8', newline = '') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None: # empty file, no quakes
+            return _concatenate_columns([])
+        time_column = header.index('time')
+        columns = [header.index(_COLUMNS[field]) for field in FIELDS]
+        parts = []
+        while True:
+            chunk = list(itertools.islice(reader, chunk_size))
+            if len(chunk) == 0:
+                break
+            rows = [row for row in chunk if len(row) != 0] # blank lines, e.g. between concatenated parts
+            if len(rows) != 0:
+                parts.append(_parse_rows(rows, time_column, columns))
+
+    return _concatenate_columns(parts)
+
+def _read_usgs_csvs(src_fld, fns, chunk_size, workers):
+
+    paths = [os.path.join(src_fld, fn) for fn in fns]
+    read_usgs_csv = functools.partial(_read_usgs_csv_sorted, chunk_size = chunk_size)
+
+    if workers > 1:
+        with mp.Pool(processes = workers) as pool:
+            parts = list(tqdm.tqdm(pool.imap(read_usgs_csv, paths, chunksize = 4), total = len(paths)))
+    else:
+        parts = [read_usgs_csv(path) for path in tqdm.tqdm(paths)]
+
+    broken = sum(part[2] for part in parts)
+    usgs_time, usgs_data = _merge_sorted([part[:2] for part in parts])
+    print(f'Quakes ok={usgs_time.shape[0]:d} broken={broken:d}')
+
+    return usgs_time, usgs_data
+
+def _read_usgs_csv_sorted(fn, chunk_size):
+
+    usgs_time, data = _read_usgs_csv(fn, chunk_size)
+
+    ok = _quakes_ok(data)
+    order = np.argsort(usgs_time[ok], kind = 'stable')
+
+    return usgs_time[ok][order], data[:, ok][:, order], ok.shape[0] - np.count_nonzero(ok)
+
+def _merge_sorted(parts):
+
+    usgs_time, data = _concatenate_columns(parts)
+
+    # parts cover disjoint, ascending intervals: merge is a concatenation
+    # unless intervals overlap at their boundaries
+    if any(
+        a[0][-1] > b[0][0]
+        for a, b in zip(parts[:-1], parts[1:])
+        if a[0].shape[0] > 0 and b[0].shape[0] > 0
+    ):
+        order = np.argsort(usgs_time, kind = 'stable')
+        usgs_time, data = usgs_time[order], data[:, order]
+
+    return usgs_time, data
+
+def _quakes_ok(data):
+    return ~(
+        np.isnan(data[FIELDS.index('lat'), :])
+        | np.isnan(data[FIELDS.index('lon'), :])
+        | np.isnan(data[FIELDS.index('depth'), :])
+    )
@@ -7,7 +7,7 @@ Earthquakes / Erdbeben 2010-2019
 source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
 https://github.com/pleiszenburg/earthquakes_youtube01
 
-    prepare_osm.py: Fetching OSM data
+    prepare_osm.py: Fetching and preparing OSM data
 
     Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
 
@@ -31,7 +31,7 @@ specific language governing rights and limitations under the License.
 
 import os
 
-from lib.osm import fetch_osm
+from lib.osm import fetch_osm, reencode_osm
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # MAIN ROUTINE
@@ -39,11 +39,21 @@ from lib.osm import fetch_osm
 
 def run():
 
-    os.mkdir('data_osm')
+    R = 6371000.0
+
+    if not os.path.exists('data_osm'):
+        os.mkdir('data_osm')
     fetch_osm(
         path = os.path.join('data_osm', 'earth-seas-10km.geo.json'),
         url = 'https://github.com/simonepri/geo-maps/releases/latest/download/earth-seas-10km.geo.json',
         )
+    reencode_osm(
+        src = os.path.join('data_osm', 'earth-seas-10km.geo.json'),
+        target = os.path.join('data_osm', 'earth-seas-10km.coast'),
+        r = R,
+        max_distance = 700000,
+        tolerances = (1000.0, 2000.0, 4000.0, 8000.0, 16000.0),
+        )
 
 if __name__ == '__main__':
     run()
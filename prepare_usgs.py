@@ -29,6 +29,8 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import argparse
+import multiprocessing as mp
 import os
 
 from lib.usgs import fetch_usgs, reencode_usgs
@@ -37,12 +39,32 @@ from lib.usgs import fetch_usgs, reencode_usgs
 # MAIN ROUTINE
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _parse_args():
+
+    parser = argparse.ArgumentParser(description = 'Fetch and prepare USGS data')
+    parser.add_argument(
+        '--connections', type = int, default = 8,
+        help = 'number of concurrent requests to the USGS service',
+    )
+    parser.add_argument(
+        '--workers', type = int, default = mp.cpu_count(),
+        help = 'number of processes parsing CSV files',
+    )
+    parser.add_argument(
+        '--incremental', action = 'store_true',
+        help = 'only add CSV files not yet ingested into an existing store',
+    )
+
+    return parser.parse_args()
+
 def run():
 
+    args = _parse_args()
+
     if not os.path.exists('data_usgs'):
         os.mkdir('data_usgs')
-    fetch_usgs('data_usgs', (2010, 1, 1), (2020, 1, 1))
-    reencode_usgs('data_usgs', 'data_usgs.zarr')
+    fetch_usgs('data_usgs', (2010, 1, 1), (2020, 1, 1), connections = args.connections)
+    reencode_usgs('data_usgs', 'data_usgs.zarr', workers = args.workers, incremental = args.incremental)
 
 if __name__ == '__main__':
     run()
@@ -29,19 +29,29 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import argparse
+import collections
+import datetime
 import math
 import multiprocessing as mp
 import os
+import queue
+import signal
+import subprocess
+import sys
+import time
 
 import tqdm
 
 import numpy as np
-import numba as nb
 import zarr
 
-from lib.camera import Camera
-from lib.image import Image
-from lib.osm import read_osm
+from lib.camera import Camera, split_lines
+from lib.image import Image, PIX_FMT
+from lib.osm import load_osm
+from lib.shared import SharedArrays, attach_shared_arrays
+from lib.timing import Stopwatch, print_timing_report, write_timing_report
+from lib.usgs import load_usgs_cart
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER
@@ -49,81 +59,178 @@ from lib.osm import read_osm
 
 _rad = lambda x: x * math.pi / 180.0
 
-def _polar_to_cart(lon, lat, length):
+_FADE_LEVELS = 16 # quantization of fading quakes into styles
 
-    lon = _rad(lon)
-    lat = _rad(lat)
+# positions and colors of heatmap color maps
+_COLORMAPS = {
+    'fire': ((0.0, 0.35, 0.7, 1.0), ((0.1, 0.1, 0.1), (0.6, 0.0, 0.0), (1.0, 0.5, 0.0), (1.0, 1.0, 0.8))),
+    'ice': ((0.0, 0.5, 1.0), ((0.1, 0.1, 0.1), (0.0, 0.4, 0.8), (0.8, 1.0, 1.0))),
+}
 
-    x = length * math.cos(lat) * math.cos(lon)
-    y = length * math.cos(lat) * math.sin(lon)
-    z = length * math.sin(lat)
+# bin edges and colors of quake color ramps, by field
+_COLOR_RAMPS = {
+    'plain': ((), ((1.0, 0.0, 0.0),)),
+    'depth': ((70.0, 300.0), ((1.0, 0.0, 0.0), (1.0, 0.8, 0.0), (0.2, 0.6, 1.0))), # km
+    'mag': ((3.0, 5.0), ((0.6, 0.0, 0.0), (1.0, 0.4, 0.0), (1.0, 1.0, 0.6))),
+}
 
-    return x, y, z
+def _get_lut(colormap, size = 256):
 
-def _polar_to_cart_geometries(polar, r):
-    cart = []
-    for collection_index, collection in enumerate(polar):
-        for poly_index, poly in enumerate(collection):
-            for subpoly_index, subpoly in enumerate(poly):
-                cart.append([
-                    _polar_to_cart(*point, r)
-                    for point in subpoly
-                ])
-    return cart
+    positions, colors = _COLORMAPS[colormap]
+    colors = np.array(colors, dtype = 'f4')
+    x = np.linspace(0.0, 1.0, size)
 
-def _distance(a, b):
-    return math.sqrt(
-        (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
-    )
+    return np.stack([
+        np.interp(x, positions, colors[:, channel])
+        for channel in range(3)
+    ], axis = 1).astype('f4')
 
-def _filter_polygons(in_poly, max_distance = 700000):
+def _epoch_ms(year, month, day):
 
-    out_poly = []
-    out_line = []
+    return int(datetime.datetime(
+        year, month, day, tzinfo = datetime.timezone.utc
+    ).timestamp() * 1000)
 
-    for in_line in in_poly:
+_COST_FRAME = 5000 # cost of a frame without quakes, in units of one quake
 
-        out_line.clear()
-        out_line.append( in_line[0] ) # A
+# scale, frame step and quake sample step of --preview
+_PREVIEW = dict(scale = 0.25, step = 10, sample = 10)
+_SHEET_FRAMES = 64 # thumbnails on contact sheet unless --step is given
+_SHEET_MAX = 32767 # px, max. width and height of a cairo surface
 
-        for A, B in zip(in_line[:-1], in_line[1:]):
+_CHUNK_DURATION = 10.0 # s, target render time of one chunk of frames
 
-            if _distance(A, B) > max_distance:
-                if len(out_line) > 1:
-                    out_poly.append(out_line.copy())
-                out_line.clear()
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_IEND = b'\x00\x00\x00\x00IEND\xaeB`\x82' # last chunk of a complete PNG file
 
-            out_line.append(B)
+def _get_frame_slice(frame_index, frames, time_start, time_end):
 
-        if len(out_line) > 1:
-            out_poly.append(out_line.copy())
-        out_line.clear()
+    # time covered by frame, works on arrays of frame indexes as well
+    span = time_end - time_start
 
-    return out_poly
+    return (
+        time_start + span * frame_index // frames,
+        time_start + span * (frame_index + 1) // frames,
+    )
 
-@nb.jit(nopython = True)
-def _polar_to_cart_jit(lon, lat, length):
+def _get_frame_costs(frames, time_start, time_end, time_tail, usgs_time):
 
-    lon = lon * math.pi / 180.0
-    lat = lat * math.pi / 180.0
+    # render cost model: constant part plus one unit per quake within time window
+    slice_start, slice_end = _get_frame_slice(np.arange(frames, dtype = 'i8'), frames, time_start, time_end)
+    start = np.searchsorted(usgs_time, slice_start - time_tail, side = 'left')
+    stop = np.searchsorted(usgs_time, slice_end, side = 'left')
 
-    return [
-        length * np.cos(lat) * np.cos(lon),
-        length * np.cos(lat) * np.sin(lon),
-        length * np.sin(lat),
-    ]
+    return _COST_FRAME + (stop - start).astype('i8')
 
-def _np_polar_to_cart(in_data, r):
+def _get_shard(costs, shard, shards):
 
-    out_data = np.zeros((3, in_data.shape[1]), dtype = 'f4')
-    for index in range(0, in_data.shape[1]):
-        out_data[:, index] = _polar_to_cart_jit(
-            lon = in_data[0, index],
-            lat = in_data[1, index],
-            length = r - (in_data[2, index] * 6000),
-        )
+    # contiguous frame range of about 1 / shards of total cost, identical on all nodes
+    cumulative = np.zeros((costs.shape[0] + 1,), dtype = 'i8')
+    cumulative[1:] = np.cumsum(costs)
+    start, stop = np.searchsorted(
+        cumulative, [cumulative[-1] * shard // shards, cumulative[-1] * (shard + 1) // shards],
+        side = 'left',
+    )
 
-    return out_data
+    return range(int(start), int(stop))
+
+def _frame_fn(frame_index):
+
+    return os.path.join('frames', f'frame_{frame_index:05d}.png')
+
+def _frame_ok(fn):
+
+    try:
+        with open(fn, 'rb') as f:
+            if f.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+                return False
+            f.seek(-len(_PNG_IEND), os.SEEK_END)
+            return f.read() == _PNG_IEND
+    except OSError: # missing or truncated
+        return False
+
+def _render_chunks(cpu_pool, frame_indexes, window):
+
+    # contiguous chunks of frames, sized such that one chunk takes about _CHUNK_DURATION,
+    # chunks shrink towards the end so that all processes finish at about the same time
+    done = queue.Queue()
+    position, in_flight = 0, 0
+    frame_time = None # s, moving average of render time per frame
+
+    while True:
+        while in_flight < window and position < len(frame_indexes):
+            if frame_time is None:
+                size = 1
+            else:
+                size = max(1, min(
+                    int(_CHUNK_DURATION / frame_time),
+                    (len(frame_indexes) - position) // window,
+                ))
+            cpu_pool.apply_async(
+                _worker_work_chunk,
+                args = (frame_indexes[position:position + size],),
+                callback = done.put, error_callback = done.put,
+            )
+            position += size
+            in_flight += 1
+        if in_flight == 0:
+            return
+        result = done.get()
+        in_flight -= 1
+        if isinstance(result, BaseException):
+            raise result
+        chunk, elapsed, timings = result
+        if frame_time is None:
+            frame_time = elapsed / len(chunk)
+        else:
+            frame_time = 0.8 * frame_time + 0.2 * elapsed / len(chunk)
+        yield chunk, timings
+
+def _open_encoder(fn, W, H, fps, preview = False):
+
+    # lossless, or small and fast to encode in preview
+    quality = ['-preset', 'veryfast', '-crf', '32', '-pix_fmt', 'yuv420p'] if preview else ['-preset', 'veryslow', '-crf', '0']
+
+    return subprocess.Popen([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', PIX_FMT, '-s:v', f'{W:d}x{H:d}', '-framerate', str(fps),
+        '-i', '-',
+        '-c:v', 'libx264', *quality,
+        fn,
+        ], stdin = subprocess.PIPE)
+
+def _close_encoder(encoder):
+
+    encoder.stdin.close()
+    if encoder.wait() != 0:
+        raise subprocess.CalledProcessError(encoder.returncode, encoder.args)
+
+def _open_sheet(frames, W, H):
+
+    columns = math.ceil(math.sqrt(frames))
+    rows = math.ceil(frames / columns)
+    if columns * W > _SHEET_MAX or rows * H > _SHEET_MAX:
+        raise ValueError(f'contact sheet of {frames:d} frames exceeds {_SHEET_MAX:d} px, increase --step or reduce --scale')
+
+    return Image(columns * W, rows * H, background_color = (0.0, 0.0, 0.0)), columns
+
+def _stream_frames(cpu_pool, frame_indexes, write, window):
+
+    # frames are passed to write in submission order, at most window frames are in flight
+    frame_indexes = iter(frame_indexes)
+    in_flight = collections.deque()
+
+    while True:
+        while len(in_flight) < window:
+            frame_index = next(frame_indexes, None)
+            if frame_index is None:
+                break
+            in_flight.append(cpu_pool.apply_async(_worker_work, args = (frame_index,)))
+        if len(in_flight) == 0:
+            return
+        frame_index, frame, timing = in_flight.popleft().get()
+        write(frame)
+        yield frame_index, timing
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PARALLEL WORKER
@@ -131,14 +238,36 @@ def _np_polar_to_cart(in_data, r):
 
 def _worker_init(kwargs):
     global context
+    kwargs = kwargs.copy()
+    arrays = attach_shared_arrays(kwargs.pop('arrays'))
+    kwargs['osm_levels'] = [
+        (tolerance, arrays.pop(f'osm_vertices_{level:d}'), arrays.pop(f'osm_offsets_{level:d}'))
+        for level, tolerance in enumerate(kwargs.pop('osm_tolerances'))
+    ]
+    kwargs.update(arrays)
     context = _worker_context(**kwargs)
 
 def _worker_work(frame_index):
-    context.render_frame(frame_index)
+    return context.work(frame_index)
+
+def _worker_warm_up(kwargs):
+    # compile or load all kernels in the parent by rendering one frame, forked workers inherit them
+    global context
+    _worker_init(kwargs)
+    context.render_frame(0)
+    context = None
+
+def _worker_work_chunk(frame_indexes):
+    return context.work_chunk(frame_indexes)
 
 class _worker_context:
 
-    def __init__(self, fps, duration, W, H, R, osm_cart, usgs_cart):
+    def __init__(self,
+        fps, duration, W, H, R, output, quakes, colors, colormap, density_scale,
+        time_start, time_end, time_tail, timing,
+        osm_levels, usgs_cart, usgs_time, usgs_value = None,
+        scale = 1.0, osm_error = 0.5,
+        ):
 
         self._id = mp.current_process().name
         self._fps = fps
@@ -146,96 +275,475 @@ class _worker_context:
         self._W = W
         self._H = H
         self._R = R
-        self._osm_cart = osm_cart
+        self._output = output
+        self._quakes = quakes
+        self._lut = _get_lut(colormap)
+        self._density_scale = density_scale
+        self._time_start = time_start
+        self._time_end = time_end
+        self._time_tail = time_tail
+        self._osm_levels = osm_levels # (tolerance, vertices, offsets), ascending tolerance
         self._usgs_cart = usgs_cart
+        self._usgs_time = usgs_time
+        self._usgs_value = usgs_value # field selected for color ramp
+        self._stopwatch = Stopwatch(enabled = timing)
 
         self._dist = 3.0 * self._R
         self._frames = self._duration * self._fps
 
         self._camera = Camera()
         self._camera.set_focal(50.0)
-        self._camera.set_factor(30)
+        self._camera.set_factor(30 * scale) # W and H are scaled alike
         self._camera.set_center(self._W / 2, self._H / 2)
 
+        self._osm_vertices_2d = np.zeros((2, self._osm_levels[0][1].shape[1]), dtype = 'f4')
+        self._osm_visible = np.zeros((self._osm_levels[0][1].shape[1],), dtype = 'bool')
         self._usgs_cart_2d = np.zeros((2, self._usgs_cart.shape[1]), dtype = 'f4')
+        self._usgs_visible = np.zeros((self._usgs_cart.shape[1],), dtype = 'bool')
+
+        self._osm_margin = 100.0 # px, keeps segments crossing the viewport edge
+        self._osm_error = osm_error # px, max. deviation of simplified coastlines
+        self._quake_radius = 1.0
+
+        self._background_color = np.array((0.1, 0.1, 0.1), dtype = 'f4')
+
+        # one style per fade level and color bin, fade level major
+        edges, ramp = _COLOR_RAMPS[colors]
+        self._color_edges = np.array(edges, dtype = 'f4')
+        levels = np.arange(1, _FADE_LEVELS + 1, dtype = 'f4') / _FADE_LEVELS
+        self._palette = (
+            self._background_color[None, None, :]
+            + (np.array(ramp, dtype = 'f4')[None, :, :] - self._background_color[None, None, :]) * levels[:, None, None]
+        ).reshape(-1, 3)
+
+    def _get_osm_level(self):
+
+        # coarsest level within the error bound at the point of the globe closest to the camera
+        tolerance_max = self._osm_error * self._camera.get_pixel_size(self._dist - self._R)
+        _, vertices, offsets = [level for level in self._osm_levels if level[0] <= tolerance_max][-1]
+
+        return vertices, offsets
+
+    def _get_styles(self, start, stop, weights):
+
+        if self._usgs_value is None:
+            bins = np.zeros((stop - start,), dtype = 'i8')
+        else:
+            values = self._usgs_value[start:stop]
+            bins = np.where(np.isnan(values), 0, np.digitize(values, self._color_edges))
+
+        levels = np.clip(np.ceil(weights * _FADE_LEVELS).astype('i8') - 1, 0, _FADE_LEVELS - 1)
+
+        return levels * (self._color_edges.shape[0] + 1) + bins
+
+    def _get_time_window(self, frame_index):
+
+        slice_start, slice_end = _get_frame_slice(frame_index, self._frames, self._time_start, self._time_end)
+
+        # quakes are sorted by time, window is [slice_start - tail, slice_end)
+        start = int(np.searchsorted(self._usgs_time, slice_start - self._time_tail, side = 'left'))
+        stop = int(np.searchsorted(self._usgs_time, slice_end, side = 'left'))
+
+        # fade out linearly over tail, full intensity within current slice
+        age = slice_start - self._usgs_time[start:stop].astype('i8')
+        if self._time_tail > 0:
+            weights = 1.0 - np.clip(age / self._time_tail, 0.0, 1.0)
+        else:
+            weights = np.ones(age.shape, dtype = 'f8')
+
+        return start, stop, weights.astype('f4')
 
     def render_frame(self, frame_index):
 
+        stopwatch = self._stopwatch
+
         angle = 2 * math.pi * frame_index / self._frames
 
         self._camera.set_position(self._dist * math.cos(angle), self._dist * math.sin(angle), 0.0)
         self._camera.set_direction(_rad(180.0) + angle, 0.0)
         get_points = self._camera.compiled_get_points()
-
-        image = Image(self._W, self._H, background_color = (0.1, 0.1, 0.1))
-
-        for line in self._osm_cart:
-            image.draw_polygon(
-                *[self._camera.get_point(*point) for point in line],
-                line_color = (0.7, 0.7, 0.7),
-                line_width = 0.3,
+        get_osm_visible = self._camera.compiled_get_visible(self._R, self._W, self._H, self._osm_margin)
+        get_usgs_visible = self._camera.compiled_get_visible(self._R, self._W, self._H, self._quake_radius)
+
+        image = Image(self._W, self._H, background_color = self._background_color)
+        stopwatch.lap('setup')
+
+        start, stop, weights = self._get_time_window(frame_index)
+        usgs_cart_2d = self._usgs_cart_2d[:, :stop - start]
+        usgs_visible = self._usgs_visible[:stop - start]
+        usgs_styles = self._get_styles(start, stop, weights)
+        stopwatch.count('quakes_in_window', stop - start)
+        stopwatch.lap('quakes_window')
+
+        get_points(self._usgs_cart[:, start:stop], usgs_cart_2d)
+        stopwatch.lap('quakes_project')
+        get_usgs_visible(self._usgs_cart[:, start:stop], usgs_cart_2d, usgs_visible)
+        usgs_cart_2d = usgs_cart_2d[:, usgs_visible]
+        usgs_styles = usgs_styles[usgs_visible]
+        stopwatch.count('quakes_visible', usgs_styles.shape[0])
+        stopwatch.lap('quakes_cull')
+
+        if self._quakes == 'heatmap': # underneath coastlines
+            image.draw_density(
+                usgs_cart_2d, weights[usgs_visible], self._lut,
+                scale = self._density_scale,
             )
+            stopwatch.lap('quakes_draw')
+
+        osm_vertices, osm_offsets = self._get_osm_level()
+        osm_vertices_2d = self._osm_vertices_2d[:, :osm_vertices.shape[1]]
+        osm_visible = self._osm_visible[:osm_vertices.shape[1]]
+
+        get_points(osm_vertices, osm_vertices_2d)
+        stopwatch.count('osm_vertices', osm_vertices.shape[1])
+        stopwatch.lap('osm_project')
+        get_osm_visible(osm_vertices, osm_vertices_2d, osm_visible)
+        osm_index, osm_offsets = split_lines(osm_visible, osm_offsets)
+        stopwatch.count('osm_visible', osm_index.shape[0])
+        stopwatch.lap('osm_cull')
+        image.draw_polylines(
+            osm_vertices_2d[:, osm_index], osm_offsets,
+            line_color = (0.7, 0.7, 0.7),
+            line_width = 0.3,
+        )
+        stopwatch.lap('osm_stroke')
 
-        get_points(self._usgs_cart, self._usgs_cart_2d)
-        for index in range(self._usgs_cart_2d.shape[1]):
-            image.draw_filledcircle(
-                *self._usgs_cart_2d[:, index], r = 1.0,
-                fill_color = (1.0, 0.0, 0.0),
+        if self._quakes == 'cairo':
+            image.draw_filledcircles_binned(
+                usgs_cart_2d, usgs_styles, self._palette,
+                r = self._quake_radius,
             )
+            stopwatch.lap('quakes_draw')
+        elif self._quakes == 'splat':
+            image.draw_points(
+                usgs_cart_2d, radius = self._quake_radius,
+                color = self._palette[usgs_styles, :].T,
+            )
+            stopwatch.lap('quakes_draw')
+
+        return image
 
-        image.save(os.path.join('frames', f'frame_{frame_index:05d}.png'))
+    def work(self, frame_index):
+
+        self._stopwatch.start()
+        image = self.render_frame(frame_index)
+
+        if self._output in ('stream', 'sheet'):
+            frame = image.get_bytes()
+            self._stopwatch.lap('output')
+            return frame_index, frame, self._stopwatch.pop()
+
+        # atomic, an interrupted render never leaves a truncated frame behind
+        fn = _frame_fn(frame_index)
+        tmp = f'{fn:s}.tmp-{os.getpid():d}'
+        image.save(tmp)
+        os.replace(tmp, fn)
+        self._stopwatch.lap('output')
+        return frame_index, None, self._stopwatch.pop()
+
+    def work_chunk(self, frame_indexes):
+
+        t0 = time.perf_counter()
+        timings = [self.work(frame_index)[2] for frame_index in frame_indexes]
+
+        return frame_indexes, time.perf_counter() - t0, timings
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # MAIN ROUTINE
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _exit(signum, frame):
+
+    sys.exit(128 + signum)
+
+def _report_first_frame(items, t0):
+
+    for index, item in enumerate(items):
+        if index == 0:
+            tqdm.tqdm.write(f'Time to first frame: {time.perf_counter() - t0:.2f} s')
+        yield item
+
+def _render(cpu_pool, args, frame_indexes_before, W, H, fps, CPU_LEN, t0):
+
+    timings = {} # frame index -> stage timing, if enabled
+
+    if args.output == 'stream':
+        # every step-th frame only, clip keeps its duration
+        encoder = _open_encoder(args.video, W, H, f'{fps:d}/{args.step:d}', preview = args.preview)
+        try:
+            for frame_index, timing in tqdm.tqdm(
+                _report_first_frame(_stream_frames(
+                    cpu_pool, frame_indexes_before, encoder.stdin.write, window = 2 * CPU_LEN,
+                ), t0),
+                total = len(frame_indexes_before),
+            ):
+                if timing is not None:
+                    timings[frame_index] = timing
+        except BaseException:
+            encoder.kill()
+            raise
+        _close_encoder(encoder)
+        return timings
+
+    if args.output == 'sheet':
+        sheet, columns = _open_sheet(len(frame_indexes_before), W, H)
+        tiles = iter(range(0, len(frame_indexes_before)))
+        def write(frame):
+            tile = next(tiles)
+            sheet.draw_raw(frame, W, H, x = tile % columns * W, y = tile // columns * H)
+        for frame_index, timing in tqdm.tqdm(
+            _report_first_frame(_stream_frames(
+                cpu_pool, frame_indexes_before, write, window = 2 * CPU_LEN,
+            ), t0),
+            total = len(frame_indexes_before),
+        ):
+            if timing is not None:
+                timings[frame_index] = timing
+        sheet.save(args.sheet)
+        return timings
+
+    os.makedirs('frames', exist_ok = True)
+    for fn in os.listdir('frames'): # left behind by killed workers
+        if '.tmp-' in fn:
+            os.remove(os.path.join('frames', fn))
+
+    # resume: skip frames rendered by a previous run
+    frame_indexes_todo = [
+        frame_index for frame_index in frame_indexes_before
+        if not _frame_ok(_frame_fn(frame_index))
+    ]
+    print(f'Skipping {len(frame_indexes_before) - len(frame_indexes_todo):d} existing frames')
+
+    with tqdm.tqdm(total = len(frame_indexes_todo)) as progress:
+        for chunk, chunk_timings in _report_first_frame(
+            _render_chunks(cpu_pool, frame_indexes_todo, window = 2 * CPU_LEN), t0,
+        ):
+            progress.update(len(chunk))
+            timings.update(
+                (frame_index, timing) for frame_index, timing in zip(chunk, chunk_timings)
+                if timing is not None
+            )
+
+    return timings
+
+def _parse_args():
+
+    parser = argparse.ArgumentParser(description = 'Render video frames')
+    parser.add_argument(
+        '--output', choices = ('png', 'stream', 'sheet'), default = 'png',
+        help = 'write PNG frames into frames/, stream raw frames into ffmpeg or draw a contact sheet',
+    )
+    parser.add_argument(
+        '--preview', action = 'store_true',
+        help = (
+            'fast, reduced render, implies --scale {scale:g} --step {step:d} --sample {sample:d} '
+            'unless given otherwise and a low-bitrate clip in stream output'
+        ).format(**_PREVIEW),
+    )
+    parser.add_argument(
+        '--scale', type = float, default = None,
+        help = 'scale of resolution, 1.0 is 1920x1080',
+    )
+    parser.add_argument(
+        '--step', type = int, default = None,
+        help = f'render every n-th frame only, sheet output defaults to {_SHEET_FRAMES:d} frames',
+    )
+    parser.add_argument(
+        '--sample', type = int, default = None,
+        help = 'draw every n-th quake only, quakes are sorted by time',
+    )
+    parser.add_argument(
+        '--coast-error', type = float, default = 0.5,
+        help = 'max. deviation of simplified coastlines in pixels, larger is coarser',
+    )
+    parser.add_argument(
+        '--sheet', default = 'sheet.png',
+        help = 'contact sheet written in sheet output',
+    )
+    parser.add_argument(
+        '--quakes', choices = ('splat', 'cairo', 'heatmap'), default = 'splat',
+        help = 'draw quakes with the compiled rasterizer, with batched cairo paths or as a density heatmap',
+    )
+    parser.add_argument(
+        '--colormap', choices = tuple(_COLORMAPS.keys()), default = 'fire',
+        help = 'color map of the heatmap',
+    )
+    parser.add_argument(
+        '--density-scale', type = float, default = 100.0,
+        help = 'quakes per pixel at which the heatmap saturates',
+    )
+    parser.add_argument(
+        '--colors', choices = tuple(_COLOR_RAMPS.keys()), default = 'plain',
+        help = 'color quakes uniformly or by depth or magnitude',
+    )
+    parser.add_argument(
+        '--tail', type = float, default = 30.0,
+        help = 'fade-out period of quakes in days, 0 shows each quake within its frame only',
+    )
+    parser.add_argument(
+        '--video', default = 'video.mp4',
+        help = 'video file written by ffmpeg in stream mode',
+    )
+    parser.add_argument(
+        '--timing', metavar = 'PREFIX',
+        help = 'record per-stage render times and write PREFIX.json and PREFIX.csv',
+    )
+    parser.add_argument(
+        '--verify', action = 'store_true',
+        help = 'only check that frames/ holds all frames, e.g. after merging shards',
+    )
+    subset = parser.add_mutually_exclusive_group()
+    subset.add_argument(
+        '--shard', type = _shard_spec,
+        help = 'render shard i of n (0 <= i < n), shards have about equal cost',
+    )
+    subset.add_argument(
+        '--frames', type = _frames_spec,
+        help = 'render frames start:stop only',
+    )
+
+    args = parser.parse_args()
+    if args.output != 'png' and (args.shard is not None or args.frames is not None):
+        parser.error('shards and frame ranges require PNG output')
+    if args.tail < 0.0:
+        parser.error('fade-out period must not be negative')
+    if args.preview and args.output == 'png':
+        parser.error('previews require stream or sheet output, frames/ is kept for full renders')
+
+    defaults = dict(_PREVIEW) if args.preview else dict(scale = 1.0, step = 1, sample = 1)
+    if args.output == 'sheet':
+        defaults.pop('step') # derived from number of frames to render
+    for name, value in defaults.items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    return args
+
+def _shard_spec(value):
+
+    try:
+        shard, shards = (int(item) for item in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected i/n, got "{value:s}"')
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError(f'expected 0 <= i < n, got "{value:s}"')
+
+    return shard, shards
+
+def _frames_spec(value):
+
+    try:
+        start, stop = (int(item) for item in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected start:stop, got "{value:s}"')
+    if not 0 <= start <= stop:
+        raise argparse.ArgumentTypeError(f'expected 0 <= start <= stop, got "{value:s}"')
+
+    return start, stop
+
+def _verify(frames):
+
+    missing = [frame_index for frame_index in range(0, frames) if not _frame_ok(_frame_fn(frame_index))]
+    if len(missing) > 0:
+        print(f'{len(missing):d} of {frames:d} frames missing or incomplete, first: {missing[:10]}')
+        sys.exit(1)
+    print(f'All {frames:d} frames present')
+
 def run():
 
-    W, H = 1920, 1080
+    t0 = time.perf_counter()
+    args = _parse_args()
+
+    W, H = round(1920 * args.scale), round(1080 * args.scale)
+    if args.output == 'stream': # even sizes for chroma subsampled encoding
+        W, H = W + W % 2, H + H % 2
     R = 6371000.0
+    DEPTH_FACTOR = 6.0 # exaggeration
 
     fps = 60
     duration = 120
 
-    DATA_OSM = os.path.join('data_osm', 'earth-seas-10km.geo.json')
+    time_start = _epoch_ms(2010, 1, 1)
+    time_end = _epoch_ms(2020, 1, 1)
+    time_tail = round(args.tail * 24 * 60 * 60 * 1000) # fade-out period of quakes in ms
+
+    DATA_OSM = os.path.join('data_osm', 'earth-seas-10km.coast')
     DATA_USGS = 'data_usgs.zarr'
 
+    if args.verify:
+        _verify(duration * fps)
+        return
+
     CPU_LEN = mp.cpu_count()
 
     print(f'Running in {CPU_LEN:d} processes!')
 
     print('Reading data ...')
 
-    osm_polar = read_osm(DATA_OSM)
-    osm_cart = _filter_polygons(_polar_to_cart_geometries(osm_polar, R))
+    osm_levels = load_osm(DATA_OSM, R)
 
     usgs = zarr.open(DATA_USGS, 'r')
-    usgs_cart = _np_polar_to_cart(usgs['data'][:3, :], R)
+    usgs_cart = load_usgs_cart(DATA_USGS, R, DEPTH_FACTOR)[:, ::args.sample]
+    usgs_time = usgs['time'][::args.sample]
+    if args.colors != 'plain':
+        usgs_value = usgs['data'][usgs.attrs['fields'].index(args.colors), ::args.sample]
+
+    frame_indexes = range(0, duration * fps)
+    if args.frames is not None:
+        frame_indexes = frame_indexes[args.frames[0]:args.frames[1]]
+    elif args.shard is not None:
+        frame_indexes = _get_shard(
+            _get_frame_costs(duration * fps, time_start, time_end, time_tail, usgs_time),
+            *args.shard,
+        )
+    if args.step is None:
+        args.step = max(-(-len(frame_indexes) // _SHEET_FRAMES), 1)
+    frame_indexes = frame_indexes[::args.step]
+    print(f'Rendering frames {frame_indexes.start:d} to {frame_indexes.stop:d} (exclusive), step {args.step:d}')
+
+    with SharedArrays() as shared:
+
+        for level, (_, osm_vertices, osm_offsets) in enumerate(osm_levels):
+            shared.add(f'osm_vertices_{level:d}', osm_vertices)
+            shared.add(f'osm_offsets_{level:d}', osm_offsets)
+        shared.add('usgs_cart', usgs_cart)
+        shared.add('usgs_time', usgs_time)
+        if args.colors != 'plain':
+            shared.add('usgs_value', usgs_value)
+
+        worker_kwargs = dict(
+            fps = fps, duration = duration,
+            W = W, H = H, R = R, output = args.output,
+            quakes = args.quakes, colors = args.colors,
+            colormap = args.colormap, density_scale = args.density_scale,
+            time_start = time_start, time_end = time_end, time_tail = time_tail,
+            timing = args.timing is not None,
+            scale = args.scale, osm_error = args.coast_error,
+            osm_tolerances = [tolerance for tolerance, _, _ in osm_levels],
+            arrays = shared.descriptors,
+        )
 
-    print('Starting workers ...')
+        t1 = time.perf_counter()
+        _worker_warm_up(worker_kwargs)
+        print(f'Kernels ready after {time.perf_counter() - t1:.2f} s')
 
-    cpu_pool = mp.Pool(
-        processes = CPU_LEN,
-        initializer = _worker_init,
-        initargs = (dict(
-            fps = fps, duration = duration,
-            W = W, H = H, R = R,
-            osm_cart = osm_cart, usgs_cart = usgs_cart,
-        ),),
-    )
+        print('Starting workers ...')
+
+        with mp.Pool(
+            processes = CPU_LEN,
+            initializer = _worker_init,
+            initargs = (worker_kwargs,),
+        ) as cpu_pool:
+
+            # unwind on termination so that shared memory gets released
+            signal.signal(signal.SIGTERM, _exit)
 
-    print('Rendering ...')
+            print('Rendering ...')
 
-    os.mkdir('frames')
+            timings = _render(cpu_pool, args, frame_indexes, W, H, fps, CPU_LEN, t0)
 
-    frame_indexes_before = range(0, duration * fps) # frame indexes
-    pool_results = [
-        cpu_pool.apply_async(
-            _worker_work,
-            args = (frame_index,)
-        ) for frame_index in frame_indexes_before
-        ]
-    frame_indexes_after = [result.get() for result in tqdm.tqdm(pool_results)]
+    if args.timing is not None:
+        print_timing_report(write_timing_report(args.timing, timings))
 
 if __name__ == '__main__':
     run()
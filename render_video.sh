@@ -20,4 +20,6 @@
 # specific language governing rights and limitations under the License.
 # </LICENSE_BLOCK>
 
+./render_frames.py --verify || exit 1
+
 ffmpeg -framerate 60 -i frames/frame_%05d.png -s:v 1920x1080 -c:v libx264 -preset veryslow -crf 0 video.mp4
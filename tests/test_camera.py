@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    tests/test_camera.py: Projection precision and line splitting
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import math
+
+import numpy as np
+
+from lib.camera import split_lines
+
+from benchmarks.camera import make_camera, reference_get_points
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+R = 6371000.0
+
+_VIEWS = ((0.3, 0.0, False), (1.2, 0.4, True), (4.0, -0.7, False)) # azimuth, tilt, flip
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _random_points(n, r, seed = 0):
+
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size = (3, n))
+    points *= r / np.linalg.norm(points, axis = 0)
+
+    return points.astype('f4')
+
+def _make_views(dist):
+
+    for angle_a, angle_b, flip in _VIEWS:
+        camera = make_camera(1920, 1080)
+        camera.set_flip(flip)
+        camera.set_position(*np.array([ # single precision, for point at camera position below
+            dist * math.cos(angle_a), dist * math.sin(angle_a), 0.2 * dist,
+            ], dtype = 'f4').tolist())
+        camera.set_direction(math.pi + angle_a, angle_b)
+        yield camera
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TESTS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def test_compiled_get_points_precision():
+
+    points_3d = _random_points(100000, R)
+
+    for camera in _make_views(3.0 * R):
+
+        reference = reference_get_points(camera, points_3d)
+        points_2d = np.zeros((2, points_3d.shape[1]), dtype = 'f4')
+        camera.compiled_get_points()(points_3d, points_2d)
+
+        # scale-free error, projections far off-screen are large numbers
+        scale = np.maximum(np.abs(reference), 1.0)
+        assert np.max(np.abs(points_2d - reference) / scale) < 1e-6
+
+def test_get_point_precision():
+
+    points_3d = _random_points(1000, R)
+
+    for camera in _make_views(3.0 * R):
+
+        reference = reference_get_points(camera, points_3d)
+        points_2d = np.array([camera.get_point(*point) for point in points_3d.astype('f8').T.tolist()]).T
+
+        assert np.allclose(points_2d, reference, rtol = 1e-9, atol = 1e-6)
+
+def test_point_at_camera():
+
+    # point at camera position cannot be projected
+    for camera in _make_views(3.0 * R):
+
+        at_camera = np.array([[camera._KPosX], [camera._KPosY], [camera._KPosZ]], dtype = 'f4')
+        points_2d = np.zeros((2, 1), dtype = 'f4')
+        camera.compiled_get_points()(at_camera, points_2d)
+
+        assert np.all(np.isnan(points_2d))
+        assert all(math.isnan(value) for value in camera.get_point(camera._KPosX, camera._KPosY, camera._KPosZ))
+
+def test_split_lines():
+
+    # one line falling apart into many runs, next to lines without runs
+    visible = np.array([1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 0, 1, 1, 1], dtype = 'bool')
+    offsets = np.array([0, 11, 13, 16], dtype = 'i8')
+
+    index, lines = split_lines(visible, offsets)
+
+    assert index.tolist() == [0, 1, 3, 4, 6, 7, 9, 10, 13, 14, 15]
+    assert lines.tolist() == [0, 2, 4, 6, 8, 11]
+
+def test_split_lines_invisible():
+
+    visible = np.zeros((16,), dtype = 'bool')
+    offsets = np.array([0, 11, 13, 16], dtype = 'i8')
+
+    index, lines = split_lines(visible, offsets)
+
+    assert index.tolist() == []
+    assert lines.tolist() == [0]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MAIN ROUTINE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def run():
+
+    # without pytest: python -m tests.test_camera
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name:s} ok')
+
+if __name__ == '__main__':
+    run()
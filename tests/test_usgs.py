@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Earthquakes / Erdbeben 2010-2019
+source code behind https://www.youtube.com/watch?v=RLHM5MQ5kAs
+https://github.com/pleiszenburg/earthquakes_youtube01
+
+    tests/test_usgs.py: Fetching from a local stand-in for the USGS service, bucket index
+
+    Copyright (C) 2020 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/earthquakes_youtube01/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import contextlib
+import csv
+import datetime
+import http.server
+import io
+import os
+import random
+import tempfile
+import threading
+import unittest.mock
+import urllib.parse
+
+import numpy as np
+import zarr
+
+from lib import usgs
+from lib.geometry import polar_to_cart
+
+from benchmarks.synthetic import make_quakes
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+A = (2010, 1, 1)
+B = (2010, 4, 1)
+
+R = 6371000.0
+DEPTH_FACTOR = 6.0
+
+_FAILURES = 0.2 # share of requests answered with 503
+
+_USGS_HEADER = [ # as served by the FDSN event service
+    'time', 'latitude', 'longitude', 'depth', 'mag', 'magType', 'nst', 'gap', 'dmin', 'rms', 'net', 'id',
+    'updated', 'place', 'type', 'horizontalError', 'depthError', 'magError', 'magNst', 'status',
+    'locationSource', 'magSource',
+]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _epoch_ms(d):
+
+    return int(datetime.datetime(*d, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+
+def _make_handler(usgs_time, usgs_data, limit, requests_log):
+
+    rng = random.Random(1)
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body = b''):
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+
+            params = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+            with lock:
+                failure = rng.random() < _FAILURES
+                requests_log.append((params, failure))
+            if failure:
+                return self._send(503)
+
+            # naive ISO times are UTC, windows are half-open
+            start, end = (
+                np.datetime64(params[name], 'ms').astype('i8')
+                for name in ('starttime', 'endtime')
+            )
+            a, b = np.searchsorted(usgs_time, [start, end])
+
+            if params['format'] == 'count':
+                return self._send(200, str(b - a).encode('utf-8'))
+            if b - a > limit:
+                return self._send(400, b'Error 400: Bad Request\n\nToo many events')
+            if b == a:
+                return self._send(204)
+
+            f = io.StringIO()
+            writer = csv.writer(f)
+            writer.writerow(_USGS_HEADER)
+            for index in range(a, b):
+                row = dict(
+                    time = f'{np.datetime_as_string(usgs_time[index].astype("datetime64[ms]"), unit = "ms"):s}Z',
+                    magType = 'ml', net = 'us', place = '10 km N of Somewhere, Alaska', type = 'earthquake',
+                )
+                row.update({usgs._COLUMNS[field]: str(usgs_data[field_index, index]) for field_index, field in enumerate(usgs.FIELDS)})
+                writer.writerow([row.get(column, '') for column in _USGS_HEADER])
+            self._send(200, f.getvalue().encode('utf-8'))
+
+    return Handler
+
+@contextlib.contextmanager
+def _serve(usgs_time, usgs_data, limit):
+
+    requests_log = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(usgs_time, usgs_data, limit, requests_log))
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]:d}/fdsnws/event/1/query', requests_log
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _fetch(fld, url, limit):
+
+    # no backoff between retries, no progress bar
+    with unittest.mock.patch.object(usgs.time, 'sleep'), contextlib.redirect_stderr(io.StringIO()):
+        usgs.fetch_usgs(fld, A, B, connections = 4, url = url, limit = limit)
+
+def _check_fetched(fld, usgs_time, usgs_data):
+
+    # windows are contiguous and cover the interval, every quake was fetched exactly once
+    intervals = usgs._fetched_intervals(fld)
+    assert intervals[0][0] == usgs._date(A)
+    assert intervals[-1][1] == usgs._date(B)
+    assert all(a[1] == b[0] for a, b in zip(intervals[:-1], intervals[1:]))
+
+    fns = sorted(fn for fn in os.listdir(fld) if fn.endswith('.csv'))
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        fetched_time, fetched_data = usgs._read_usgs_csvs(fld, fns, 1000, 1)
+    assert np.array_equal(fetched_time, usgs_time.astype('i8'))
+    assert np.array_equal(fetched_data, usgs_data)
+
+    return intervals
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TESTS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def test_fetch_usgs():
+
+    limit = 1000
+    usgs_time, usgs_data = make_quakes(5000, seed = 0, time_start = _epoch_ms(A), time_end = _epoch_ms(B))
+
+    with tempfile.TemporaryDirectory() as fld, _serve(usgs_time, usgs_data, limit) as (url, requests_log):
+
+        _fetch(fld, url, limit)
+        assert any(failure for _, failure in requests_log) # retried
+        _check_fetched(fld, usgs_time, usgs_data)
+
+        # second run finds everything on disk
+        requests_log.clear()
+        _fetch(fld, url, limit)
+        assert len(requests_log) == 0
+
+def test_fetch_usgs_burst():
+
+    # aftershock sequence, more quakes within 6 hours than the service returns at once
+    limit = 1000
+    burst_start = _epoch_ms((2010, 2, 27, 6))
+    background_time, background_data = make_quakes(3000, seed = 1, time_start = _epoch_ms(A), time_end = _epoch_ms(B))
+    burst_time, burst_data = make_quakes(4000, seed = 2, time_start = burst_start, time_end = burst_start + 6 * 3600 * 1000)
+    order = np.argsort(np.concatenate([background_time, burst_time]), kind = 'stable')
+    usgs_time = np.concatenate([background_time, burst_time])[order]
+    usgs_data = np.concatenate([background_data, burst_data], axis = 1)[:, order]
+
+    with tempfile.TemporaryDirectory() as fld, _serve(usgs_time, usgs_data, limit) as (url, _):
+
+        _fetch(fld, url, limit)
+        intervals = _check_fetched(fld, usgs_time, usgs_data)
+
+        # windows were split down to below the limit within the burst
+        assert any(end - start < datetime.timedelta(hours = 6) for start, end in intervals)
+        bounds = [_epoch_ms(start.timetuple()[:6]) for start, _ in intervals] + [_epoch_ms(B)]
+        assert np.diff(np.searchsorted(usgs_time, bounds)).max() <= limit
+
+def test_usgs_index():
+
+    usgs_time, usgs_data = make_quakes(20000, seed = 3, time_start = _epoch_ms(A), time_end = _epoch_ms(B))
+    usgs_cart = polar_to_cart(usgs_data[:3, :], R, DEPTH_FACTOR).astype('f8')
+
+    with tempfile.TemporaryDirectory() as fld:
+
+        usgs.write_usgs_zarr(os.path.join(fld, 'data_usgs.zarr'), usgs_time, usgs_data)
+        index = usgs.UsgsIndex(os.path.join(fld, 'data_usgs.zarr'))
+
+        rng = np.random.default_rng(4)
+        for _ in range(20):
+
+            # windows within, across and beyond the stored slabs
+            time_start = int(rng.integers(_epoch_ms(A) - 10 * 86400000, _epoch_ms(B)))
+            time_end = time_start + int(rng.integers(1, 40 * 86400000))
+            position = rng.normal(size = 3)
+            position *= rng.uniform(1.05, 4.0) * R / np.linalg.norm(position)
+
+            starts, stops = index.query(time_start, time_end, position, R)
+            assert np.all(starts < stops)
+            assert np.all(stops[:-1] < starts[1:]) # sorted, disjoint and merged
+            candidates = np.zeros(usgs_time.shape, dtype = 'bool')
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                candidates[start:stop] = True
+
+            # superset of quakes in window on the near side of the horizon, as culled by the renderer
+            visible = (
+                (usgs_time >= time_start) & (usgs_time < time_end)
+                & (position @ usgs_cart > R ** 2)
+            )
+            assert np.all(candidates[visible])
+
+        # far side of the planet is skipped
+        time_start = _epoch_ms((2010, 2, 1))
+        time_end = time_start + 30 * 86400000
+        starts, stops = index.query(time_start, time_end, (-3.0 * R, 0.0, 0.0), R)
+        assert np.sum(stops - starts) < 0.75 * np.count_nonzero((usgs_time >= time_start) & (usgs_time < time_end))
+
+def test_usgs_index_incremental():
+
+    # appended in order, after a gap, and overlapping the stored tail
+    usgs_time, usgs_data = make_quakes(30000, seed = 5, time_start = _epoch_ms(A), time_end = _epoch_ms(B))
+    parts = [np.arange(0, 10000), np.arange(10000, 15000), np.arange(20000, 30000), np.arange(15000, 20000)]
+
+    with tempfile.TemporaryDirectory() as fld:
+
+        usgs.write_usgs_zarr(os.path.join(fld, 'incremental.zarr'), usgs_time[parts[0]], usgs_data[:, parts[0]])
+        with contextlib.redirect_stdout(io.StringIO()):
+            for part in parts[1:]:
+                incremental = zarr.open(os.path.join(fld, 'incremental.zarr'), 'r+')
+                usgs._update_usgs_index(incremental, usgs._append_usgs_zarr(incremental, usgs_time[part], usgs_data[:, part]))
+
+        usgs.write_usgs_zarr(os.path.join(fld, 'full.zarr'), usgs_time, usgs_data)
+        full = zarr.open(os.path.join(fld, 'full.zarr'), 'r')
+
+        assert incremental.attrs['index'] == full.attrs['index']
+        for name in ('time', 'index_order', 'index_offsets'):
+            assert np.array_equal(incremental[name][:], full[name][:])
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MAIN ROUTINE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def run():
+
+    # without pytest: python -m tests.test_usgs
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name:s} ok')
+
+if __name__ == '__main__':
+    run()